@@ -0,0 +1,90 @@
+"""
+Response curves of mappings, baked into lookup tables when the mappings are compiled.
+"""
+import bpy
+import numpy
+
+
+class MidiController_Curves:
+    """Bake the response curve of a mapping into a table with one property value per midi value.
+    """
+    types = [
+        ("LINEAR", "Linear", "Straight from min to max"),
+        ("LOG", "Logarithmic", "Fast at the start, slow at the end"),
+        ("EXP", "Exponential", "Slow at the start, fast at the end"),
+        ("S_CURVE", "S-Curve", "Slow at both ends, fast in the middle"),
+        ("STEPPED", "Stepped", "Quantized into a number of steps"),
+        ("CUSTOM", "Custom", "Drawn curve"),
+    ]
+    # Hidden node group holding the curve widget used to draw custom curves.
+    node_group_name = ".MidiControlCurve"
+
+    def shape(mapping, t):
+        # t: numpy array of 0..1 -> 0..1
+        curve = mapping.get("curve", "LINEAR")
+        amount = max(float(mapping.get("curve_amount", 4.0)), 1e-6)
+        if curve == "LOG":
+            return numpy.log1p(amount * t) / numpy.log1p(amount)
+        if curve == "EXP":
+            return numpy.expm1(amount * t) / numpy.expm1(amount)
+        if curve == "S_CURVE":
+            s = 1.0 / (1.0 + numpy.exp(-amount * (t - 0.5)))
+            low = 1.0 / (1.0 + numpy.exp(amount * 0.5))
+            high = 1.0 / (1.0 + numpy.exp(-amount * 0.5))
+            return (s - low) / (high - low)
+        if curve == "STEPPED":
+            steps = max(int(mapping.get("curve_steps", 4)), 2)
+            return numpy.minimum(numpy.floor(t * steps), steps - 1) / (steps - 1)
+        if curve == "CUSTOM":
+            points = sorted(mapping.get("curve_points", [[0.0, 0.0], [1.0, 1.0]]))
+            return numpy.interp(t, [point[0] for point in points], [point[1] for point in points])
+        return t
+
+    def bake(mapping):
+        """Returns a list of (1 << resolution) property values, indexed by the midi value.
+        """
+        count = 1 << mapping.get("resolution", 7)
+        t = numpy.arange(count, dtype=numpy.float64) / (count - 1)
+        if mapping.get("curve_invert", False):
+            t = 1.0 - t
+        shaped = MidiController_Curves.shape(mapping, t)
+        table = mapping["min"] + shaped * (mapping["max"] - mapping["min"])
+        # Plain floats, indexing a list is the cheapest lookup for single values.
+        return table.tolist()
+
+    def get_curve_node(create=False):
+        node_group = bpy.data.node_groups.get(MidiController_Curves.node_group_name)
+        if node_group is None:
+            if not create:
+                return None
+            node_group = bpy.data.node_groups.new(
+                MidiController_Curves.node_group_name, 'ShaderNodeTree')
+        node = node_group.nodes.get("Curve")
+        if node is None:
+            if not create:
+                return None
+            node = node_group.nodes.new('ShaderNodeFloatCurve')
+            node.name = "Curve"
+        return node
+
+    def load_points(points):
+        # Show the points of a mapping in the curve widget, must not be called from draw().
+        node = MidiController_Curves.get_curve_node(create=True)
+        curve = node.mapping.curves[0]
+        while len(curve.points) > 2:
+            curve.points.remove(curve.points[-1])
+        points = sorted(points) if len(points) >= 2 else [[0.0, 0.0], [1.0, 1.0]]
+        curve.points[0].location = points[0]
+        curve.points[1].location = points[-1]
+        for x, y in points[1:-1]:
+            curve.points.new(x, y)
+        for point in curve.points:
+            # Baking interpolates linearly, show it that way.
+            point.handle_type = 'VECTOR'
+        node.mapping.update()
+
+    def read_points():
+        node = MidiController_Curves.get_curve_node()
+        if node is None:
+            return [[0.0, 0.0], [1.0, 1.0]]
+        return [[point.location[0], point.location[1]] for point in node.mapping.curves[0].points]
@@ -0,0 +1,116 @@
+"""
+Smooths the values of noisy controls before they are written to a property.
+"""
+import math
+
+
+class MidiController_Filter():
+    """Filter of one mapping, works on the property value (after min/max conversion).
+
+    set_target is called for every incoming value, step once per tick until the
+    output settles on the target. Until then step only returns a value when it moved
+    more than epsilon from the last written value, so jitter does not cause property
+    writes. The target it settles on is always written, so the property ends up
+    exactly where the control stopped.
+    """
+    modes = [
+        ("NONE", "None", "Write every value, only apply the dead-band and epsilon"),
+        ("EXPONENTIAL", "Exponential", "Move towards the value with a time constant"),
+        ("ONE_EURO", "One-Euro", "Smooth slow movements, follow fast movements"),
+    ]
+    default_settings = {
+        "mode": "NONE",
+        # seconds to get ~63% of the way to a new value (exponential)
+        "time_constant": 0.05,
+        # Hz, the smoothing when the control is not moving (one-euro)
+        "min_cutoff": 1.0,
+        # how much the cutoff rises with the speed of the control (one-euro)
+        "beta": 0.0,
+        # changes of the incoming value smaller than this are ignored
+        "deadband": 0.0,
+        # the property is only written when the output changed by more than this
+        "epsilon": 0.0,
+    }
+    # One-euro cutoff for the speed estimate, the value of the paper.
+    derivative_cutoff = 1.0
+    # Output this close to the target is snapped onto it, when epsilon is 0.
+    settle_threshold = 1e-5
+
+    def __init__(self, settings, write):
+        self.mode = settings.get("mode", "NONE")
+        self.time_constant = max(settings.get("time_constant", 0.05), 1e-4)
+        self.min_cutoff = max(settings.get("min_cutoff", 1.0), 1e-4)
+        self.beta = settings.get("beta", 0.0)
+        self.deadband = settings.get("deadband", 0.0)
+        self.epsilon = settings.get("epsilon", 0.0)
+        # write(objects, value)
+        self.write = write
+        self.reset()
+
+    def from_mapping(mapping, write):
+        # None when the mapping has no filter, it is then written directly.
+        settings = mapping.get("filter")
+        if settings is None:
+            return None
+        if settings.get("mode", "NONE") == "NONE" and settings.get("deadband", 0) <= 0 and settings.get("epsilon", 0) <= 0:
+            return None
+        return MidiController_Filter(settings, write)
+
+    def reset(self):
+        self.target = None
+        self.value = None
+        self.written = None
+        self.speed = 0.0
+        self.time = 0.0
+        self.settled = True
+
+    def set_target(self, value, now):
+        # Returns False when the value falls within the dead-band.
+        if self.target is not None and abs(value - self.target) <= self.deadband:
+            return False
+        self.target = value
+        if self.value is None or self.mode == "NONE":
+            self.value = value
+            self.time = now
+        elif self.settled:
+            # Not stepped while settled, the first step only covers the time since this value.
+            self.time = now
+        self.settled = False
+        return True
+
+    def alpha(self, cutoff, elapsed):
+        tau = 1.0 / (2.0 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / elapsed)
+
+    def step(self, now):
+        """Advance the filter to now, returns the value to write or None.
+        """
+        if self.settled:
+            return None
+        elapsed = now - self.time
+        if elapsed > 0:
+            self.time = now
+            previous = self.value
+            if self.mode == "EXPONENTIAL":
+                self.value += (self.target - self.value) * \
+                    (1.0 - math.exp(-elapsed / self.time_constant))
+            elif self.mode == "ONE_EURO":
+                speed = (self.target - previous) / elapsed
+                self.speed += (speed - self.speed) * \
+                    self.alpha(self.derivative_cutoff, elapsed)
+                cutoff = self.min_cutoff + self.beta * abs(self.speed)
+                self.value += (self.target - self.value) * \
+                    self.alpha(cutoff, elapsed)
+            else:
+                self.value = self.target
+
+        if abs(self.target - self.value) <= max(self.epsilon, self.settle_threshold):
+            self.value = self.target
+            self.speed = 0.0
+            self.settled = True
+            if self.value == self.written:
+                return None
+        elif self.written is not None and abs(self.value - self.written) <= self.epsilon:
+            return None
+        self.written = self.value
+        return self.value
@@ -0,0 +1,171 @@
+"""
+Journal of every received midi message, in a memory-mapped ring file.
+"""
+import mmap
+import os
+import struct
+import time
+
+
+class MidiController_Journal():
+    """Fixed size ring of (timestamp, device, status, data1, data2) entries.
+
+    Entries are packed straight into the mapped file, nothing is allocated per message.
+    The header holds the total number of written entries, so a reader knows where the
+    ring wraps. Timestamps are wall clock seconds (time.time()).
+
+    Device indices only mean something in the session that wrote them, so the entries
+    store the position of the device name in the table after the header (version 2).
+    """
+    MAGIC = b"MIDJ"
+    VERSION = 2
+    # magic, version, entry size, capacity, written entries
+    header = struct.Struct("<4sHHIQ12x")
+    # utf-8 name of a device, zero padded
+    device_name = struct.Struct("<64s")
+    max_devices = 16
+    # Device of the entries whose device did not fit in the table.
+    unknown_device = 0xFFFF
+    entries_offset = header.size + max_devices * device_name.size
+    # timestamp, device (position in the name table), status, data1, data2
+    entry = struct.Struct("<dHBBB3x")
+    default_capacity = 65536
+
+    def __init__(self):
+        self.file = None
+        self.map = None
+        self.path = ""
+        self.capacity = 0
+        self.written = 0
+        self.clock_offset = 0.0
+        # {device name: position in the name table}
+        self.device_ids = {}
+
+    def is_open(self):
+        return self.map is not None
+
+    def open(self, path, capacity=None):
+        """Creates the journal at path, or keeps appending to the journal already there.
+
+        A journal with another layout or capacity is started over, any other existing
+        file is refused (raises) instead of being overwritten.
+        """
+        if capacity is None:
+            capacity = self.default_capacity
+        self.close()
+        size = self.entries_offset + capacity * self.entry.size
+        stored = None
+        if os.path.exists(path):
+            with open(path, "rb") as existing:
+                data = existing.read(self.header.size)
+            if len(data) < self.header.size or self.header.unpack_from(data, 0)[0] != self.MAGIC:
+                raise Exception(f"Not a midi journal, refusing to overwrite: {path}")
+            stored = self.header.unpack_from(data, 0)
+        self.file = open(path, "r+b" if stored is not None else "w+b")
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+        self.path = path
+        self.capacity = capacity
+        self.written = 0
+        self.device_ids = {}
+        if stored is not None:
+            magic, version, entry_size, stored_capacity, written = stored
+            if version == self.VERSION and entry_size == self.entry.size and stored_capacity == capacity:
+                # Keep appending to the existing journal, with its devices.
+                self.written = written
+                for position, name in enumerate(MidiController_Journal.read_device_names(self.map)):
+                    self.device_ids[name] = position
+        if self.written == 0:
+            self.map[self.header.size:self.entries_offset] = bytes(self.entries_offset - self.header.size)
+        self.write_header()
+        # Arrival times are perf_counter based, store them as wall clock time.
+        self.clock_offset = time.time() - time.perf_counter()
+
+    def write_header(self):
+        self.header.pack_into(self.map, 0, self.MAGIC, self.VERSION, self.entry.size,
+                              self.capacity, self.written)
+
+    def device_id(self, name):
+        # Position of the device name in the table, added when it is new.
+        position = self.device_ids.get(name)
+        if position is None:
+            position = len(self.device_ids)
+            if position >= self.max_devices:
+                return self.unknown_device
+            self.device_name.pack_into(self.map, self.header.size + position * self.device_name.size,
+                                       name.encode("utf-8")[:self.device_name.size])
+            self.device_ids[name] = position
+        return position
+
+    def write(self, messages, device_list):
+        # messages: (data, delta, arrival, device index), as read from the input queue.
+        # device_list: MidiController_Midi.device_list, to store the device by name.
+        ids = [self.unknown_device if device is None else self.device_id(device.name)
+               for device in device_list]
+        device_count = len(ids)
+        pack_into = self.entry.pack_into
+        journal_map = self.map
+        capacity = self.capacity
+        offset = self.entries_offset
+        size = self.entry.size
+        clock_offset = self.clock_offset
+        written = self.written
+        for message in messages:
+            data = message[0]
+            length = len(data)
+            device = message[3]
+            pack_into(journal_map, offset + (written % capacity) * size,
+                      message[2] + clock_offset,
+                      ids[device] if device < device_count else self.unknown_device,
+                      data[0] if length > 0 else 0,
+                      data[1] if length > 1 else 0,
+                      data[2] if length > 2 else 0)
+            written += 1
+        self.written = written
+        self.write_header()
+
+    def close(self):
+        if self.map is not None:
+            self.map.flush()
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def read_device_names(data):
+        names = []
+        device_name = MidiController_Journal.device_name
+        for position in range(MidiController_Journal.max_devices):
+            name = device_name.unpack_from(data, MidiController_Journal.header.size + position * device_name.size)[0]
+            name = name.rstrip(b"\0")
+            if len(name) == 0:
+                break
+            names.append(name.decode("utf-8", errors="ignore"))
+        return names
+
+    def read(path):
+        """Returns the device names and the entries of a journal file, oldest first, as
+        (timestamp, device, status, data1, data2) tuples. device is the position in the
+        device names, or a device index of the session that wrote a version 1 journal
+        (which has no names).
+        """
+        header = MidiController_Journal.header
+        entry = MidiController_Journal.entry
+        with open(path, "rb") as journal_file:
+            data = journal_file.read()
+        magic, version, entry_size, capacity, written = header.unpack_from(data, 0)
+        if magic != MidiController_Journal.MAGIC or entry_size != entry.size:
+            raise Exception(f"Not a midi journal: {path}")
+        if version >= 2:
+            device_names = MidiController_Journal.read_device_names(data)
+            offset = MidiController_Journal.entries_offset
+        else:
+            device_names = []
+            offset = header.size
+        count = min(written, capacity)
+        first = written - count
+        entries = []
+        for i in range(first, written):
+            entries.append(entry.unpack_from(data, offset + (i % capacity) * entry.size))
+        return (device_names, entries)
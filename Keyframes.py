@@ -0,0 +1,170 @@
+"""
+Writes keyframes in bulk through the F-Curve api instead of keyframe_insert per property.
+"""
+import bpy
+import numpy
+
+
+class MidiController_Keyframes:
+    """Resolve F-Curves once per (object, data_path, index) and add points in bulk.
+    """
+
+    def resolve_channel(obj, mapping):
+        # Returns (data_path, index, value) for a mapping on obj, or None when obj does not have the property.
+        prop = mapping["property"]
+        is_array = mapping["type"] in ["<class 'Vector'>", "<class 'IDPropertyArray'>"]
+        if mapping["key"]:
+            if prop not in obj:
+                return None
+            data_path = f'["{prop}"]'
+            value = obj[prop]
+        else:
+            if not hasattr(obj, prop):
+                return None
+            data_path = prop
+            value = getattr(obj, prop)
+        if is_array:
+            return (data_path, mapping["index"], float(value[mapping["index"]]))
+        return (data_path, 0, float(value))
+
+    def get_action_fcurves(anim):
+        action = anim.action
+        if action is None:
+            return None
+        # Layered actions (blender 4.4+) keep their fcurves in a channelbag per slot.
+        if hasattr(action, "layers") and len(action.layers) > 0:
+            from bpy_extras import anim_utils
+            channelbag = anim_utils.action_get_channelbag_for_slot(
+                action, anim.action_slot)
+            if channelbag is None:
+                return None
+            return channelbag.fcurves
+        return action.fcurves
+
+    def find_fcurve(obj, data_path, index):
+        anim = obj.animation_data
+        if anim is None:
+            return None
+        fcurves = MidiController_Keyframes.get_action_fcurves(anim)
+        if fcurves is None:
+            return None
+        return fcurves.find(data_path, index=index)
+
+    def get_fcurve(obj, data_path, index):
+        fcurve = MidiController_Keyframes.find_fcurve(obj, data_path, index)
+        if fcurve is None:
+            # Let blender create the action (and slot) and the fcurve, only happens once per channel.
+            obj.keyframe_insert(data_path, index=index)
+            fcurve = MidiController_Keyframes.find_fcurve(obj, data_path, index)
+            if fcurve is not None:
+                # Drop the key keyframe_insert just made, the caller adds its own points.
+                fcurve.keyframe_points.clear()
+        return fcurve
+
+    def remove_span(fcurve, first, last):
+        # Removes the points from frame first to last, the others keep their interpolation and handles.
+        points = fcurve.keyframe_points
+        count = len(points)
+        if count == 0:
+            return
+        co = numpy.empty(count * 2, dtype=numpy.float64)
+        points.foreach_get("co", co)
+        frames = co[0::2]
+        inside = numpy.nonzero((frames >= first) & (frames <= last))[0]
+        # Back to front, so the indices of the points still to remove stay valid.
+        for i in reversed(inside):
+            points.remove(points[int(i)], fast=True)
+
+    def add_points(fcurve, frames, values):
+        # Replaces points on frames that already have one, appends the others, in one foreach_set.
+        points = fcurve.keyframe_points
+        count = len(points)
+        co = [0.0] * (count * 2)
+        if count > 0:
+            points.foreach_get("co", co)
+        existing = {}
+        for i in range(count):
+            existing[co[i * 2]] = i
+
+        added = 0
+        for frame, value in zip(frames, values):
+            i = existing.get(frame)
+            if i is None:
+                co += [frame, value]
+                added += 1
+            else:
+                co[i * 2 + 1] = value
+
+        if added > 0:
+            points.add(added)
+        points.foreach_set("co", co)
+
+    def simplify_mask(frames, values, tolerance):
+        """Ramer-Douglas-Peucker, returns a boolean mask of the points to keep.
+
+        The error of a point is its value distance to the straight line between the
+        kept neighbours at that frame, so tolerance is in the unit of the property.
+        """
+        count = len(frames)
+        keep = numpy.zeros(count, dtype=bool)
+        if count == 0:
+            return keep
+        keep[0] = True
+        keep[-1] = True
+        segments = [(0, count - 1)]
+        while segments:
+            first, last = segments.pop()
+            if last - first < 2:
+                continue
+            span = frames[last] - frames[first]
+            inner_frames = frames[first + 1:last]
+            if span == 0:
+                line = numpy.full(len(inner_frames), values[first])
+            else:
+                line = values[first] + (inner_frames - frames[first]) * ((values[last] - values[first]) / span)
+            errors = numpy.abs(values[first + 1:last] - line)
+            worst = int(numpy.argmax(errors))
+            if errors[worst] > tolerance:
+                split = first + 1 + worst
+                keep[split] = True
+                segments.append((first, split))
+                segments.append((split, last))
+        return keep
+
+    def simplify(frames, values, tolerance):
+        frames = numpy.asarray(frames, dtype=numpy.float64)
+        values = numpy.asarray(values, dtype=numpy.float64)
+        order = numpy.argsort(frames, kind="stable")
+        frames = frames[order]
+        values = values[order]
+        keep = MidiController_Keyframes.simplify_mask(frames, values, tolerance)
+        return (frames[keep], values[keep])
+
+    def insert(channels, replace_span=False):
+        """Insert keyframes for {(obj, data_path, index): (frames, values)}.
+
+        Only the given points are written, simplify them before (see simplify), the
+        existing points of the curves keep their interpolation and handles. With
+        replace_span the existing points between the first and last frame of a channel
+        are removed first, for recordings that replace what was there.
+        Returns the touched F-Curves, fcurve.update() has been called once on each.
+        """
+        fcurves = []
+        for channel, (frames, values) in channels.items():
+            obj, data_path, index = channel
+            try:
+                fcurve = MidiController_Keyframes.get_fcurve(
+                    obj, data_path, index)
+            except Exception as e:
+                print(f"Can not animate: {obj.name}.{data_path}[{index}]")
+                continue
+            if fcurve is None:
+                continue
+            if replace_span and len(frames) > 0:
+                MidiController_Keyframes.remove_span(fcurve, min(frames), max(frames))
+            MidiController_Keyframes.add_points(fcurve, frames, values)
+            fcurves.append((channel, fcurve))
+
+        for channel, fcurve in fcurves:
+            fcurve.update()
+        return [fcurve for channel, fcurve in fcurves]
@@ -0,0 +1,115 @@
+"""
+Latency of received midi through the stages of an update, kept in fixed size histograms.
+"""
+import math
+
+
+class MidiController_Histogram():
+    """Counts of durations in log spaced buckets, the memory used does not grow with the count.
+
+    Percentiles are the upper edge of the bucket they fall in, at most 2^(1/8) (~9%) above
+    the real value.
+    """
+    # seconds, everything faster ends up in the first bucket
+    minimum = 1e-6
+    buckets_per_octave = 8
+    # 1 microsecond to ~16 seconds
+    bucket_count = 24 * 8
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * self.bucket_count
+        self.count = 0
+        self.maximum = 0.0
+
+    def record(self, seconds):
+        if seconds <= self.minimum:
+            bucket = 0
+        else:
+            bucket = min(int(math.log2(seconds / self.minimum) * self.buckets_per_octave),
+                         self.bucket_count - 1)
+        self.counts[bucket] += 1
+        self.count += 1
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def upper_bound(self, bucket):
+        return self.minimum * 2 ** ((bucket + 1) / self.buckets_per_octave)
+
+    def percentile(self, fraction):
+        # seconds, None when nothing was recorded
+        if self.count == 0:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self.upper_bound(bucket), self.maximum)
+        return self.maximum
+
+
+class MidiController_Latency():
+    """Time spent by received messages in every stage, from rtmidi to the evaluated depsgraph.
+
+    MidiController_Midi stamps the messages while enabled: arrival (by the rtmidi thread),
+    read from the queue (parse_midi_messages_update), dispatch (midi_callback) and written
+    (after update_data). The depsgraph and redraw stages start at the first write or redraw
+    request after the previous one was handled.
+    """
+    stages = [
+        ("timer", "Timer", "Arrival until the update read it from the queue"),
+        ("dispatch", "Dispatch", "Read from the queue until midi_callback handled it"),
+        ("write", "Write", "midi_callback until the mapped properties were written"),
+        ("total", "Total", "Arrival until the mapped properties were written"),
+        ("depsgraph", "Depsgraph", "Properties written until the depsgraph was evaluated"),
+        ("redraw", "Redraw", "Redraw requested until the sidebars were tagged"),
+    ]
+    percentiles = [0.5, 0.95, 0.99]
+
+    def __init__(self):
+        self.enabled = False
+        self.histograms = {stage: MidiController_Histogram() for stage, name, description in self.stages}
+        # perf_counter of the messages read by the running update
+        self.read_time = 0.0
+        # perf_counter of the first write or redraw request not yet followed by a depsgraph update or redraw
+        self.write_time = None
+        self.redraw_request_time = None
+
+    def record(self, stage, seconds):
+        self.histograms[stage].record(seconds)
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+        self.write_time = None
+        self.redraw_request_time = None
+
+    def summary(self, stage):
+        # -> (count, [p50, p95, p99], maximum) in seconds
+        histogram = self.histograms[stage]
+        return (histogram.count,
+                [histogram.percentile(fraction) for fraction in self.percentiles],
+                histogram.maximum)
+
+    def to_csv(self):
+        """Every stage as a row: the count, percentiles and maximum in milliseconds, then
+        the count of each bucket, headed by the upper edge of the bucket in milliseconds.
+        """
+        histograms = list(self.histograms.values())
+        used = [bucket for bucket in range(MidiController_Histogram.bucket_count)
+                if any(histogram.counts[bucket] > 0 for histogram in histograms)]
+        header = ["stage", "count"] + [f"p{round(fraction * 100)}_ms" for fraction in self.percentiles] + \
+            ["max_ms"] + [f"{histograms[0].upper_bound(bucket) * 1000.0:.4g}" for bucket in used]
+        lines = [",".join(header)]
+        for stage, name, description in self.stages:
+            histogram = self.histograms[stage]
+            count, values, maximum = self.summary(stage)
+            row = [stage, str(count)]
+            row += ["" if value is None else f"{value * 1000.0:.4f}" for value in values]
+            row.append(f"{maximum * 1000.0:.4f}")
+            row += [str(histogram.counts[bucket]) for bucket in used]
+            lines.append(",".join(row))
+        return "\n".join(lines) + "\n"
@@ -8,23 +8,65 @@ import bpy
 import copy
 import traceback
 import json
+import time
+import collections
+import numpy
+
+from .Keyframes import *
+from .Recorder import *
+from .MidiDecode import *
+from .Filters import *
+from .Curves import *
+from .Storage import *
+from .Journal import *
+from .Replay import *
+from .Latency import *
+from .Profiler import *
+
+
+def device_attribute(name):
+    # Settings of the active device, so the ui and operators edit the device being configured.
+    return property(lambda self: getattr(self.active_device, name),
+                    lambda self, value: setattr(self.active_device, name, value))
 
 
 class MidiController_Midi():
     # to register and control midi
+    # connected_controller/connected_port are the active device, the one being configured in the ui.
     connected_controller = ""
     connected_port = None
     available_ports = None
+    # Only used to find the available ports, every device opens its own input.
     midi_input = None
     midi_open = False
     midi = None
-    midi_last_control_changed = 0
+    # Routing key (MidiController_Event.key) of the last changed control.
+    midi_last_control_changed = None
     midi_last_control_value = 0
-    midi_last_control_velocity = 0
+    midi_last_device = ""
+    # Routing key of the last control of the configured device, used when mapping.
     midi_control_to_map = None
 
-    # settings
-    loaded_json = {}
+    # Opened devices, {name: MidiController_Device}, device_list is indexed by device.index,
+    # the slots of closed devices are None until another device opens.
+    devices = {}
+    device_list = []
+    active_device = None
+
+    # midi input mode, when enabled rtmidi pushes messages from its own thread
+    # into the queue below, otherwise the timer polls the port with get_message().
+    use_input_callback = True
+    # (message, delta_time, arrival_time, device index) tuples, filled by the rtmidi threads of all devices.
+    midi_queue = collections.deque()
+    # Resolution (bits) of the last touched control, stored with new mappings.
+    midi_control_to_map_bits = 7
+
+    # settings, stored in scene.midi_control_storage, see MidiController_Storage.
+    # Names of the devices whose section changed since the last flush_save.
+    dirty_sections = set()
+    # Seconds between the last save() and writing the storage.
+    save_debounce = 0.5
+    save_scheduled = False
 
     # State machine stuff
     class State:
@@ -46,8 +88,14 @@ class MidiController_Midi():
     # The current mapping state
     current_mapping_state = State.NONE
 
-    # To interact/update ui
-    screens = None
+    # To interact/update ui, redraw_ui only requests a redraw, flush_redraw_ui tags
+    # the sidebars of the visible 3D views at most once per ui_redraw_interval.
+    # redraw_view also tags the 3D views themselves, for written properties.
+    # The interval is set from the redraw rate setting (generic_properties.ui_redraw_rate).
+    ui_redraw_interval = 0.1
+    ui_redraw_requested = False
+    ui_redraw_view_requested = False
+    ui_last_redraw_time = 0
 
     # To interact/update objects
     context = None
@@ -55,94 +103,372 @@ class MidiController_Midi():
     # Map a midi control to a property somehow
     mapping_pending = None
     mapping_error = None
-    controller_property_mapping = {}
+    controller_property_mapping = device_attribute("controller_property_mapping")
+    # controller_property_mapping compiled to {control (int): [setter, ...]}, see compile_mappings.
+    compiled_property_mapping = device_attribute("compiled_property_mapping")
+    # Filters of mappings which have not yet settled on their latest value, stepped every tick.
+    active_filters = set()
+    # Objects mappings write to, {None (the selection) / target: [objects]}, read once instead of
+    # per message and cleared by invalidate_targets on selection, collection and scene changes.
+    target_cache = {}
+    # Array properties written with foreach_set when a mapping targets a collection.
+    collection_array_properties = ["location", "rotation_euler", "scale",
+                                   "delta_location", "delta_rotation_euler", "delta_scale"]
+    # {collection name: members} written with foreach_set since the last tick, tagged for the
+    # depsgraph once per tick by flush_update_tags instead of after every message.
+    pending_update_tags = {}
     properties_to_skip = []
-    controller_names = {}
+    controller_names = device_attribute("controller_names")
 
     # Controller to edit
     editting_controller = None
     edit_state = EditState.NONE
 
     # Controller to register keyframe(s) (note: all properties)
-    key_frame_control = None
+    key_frame_control = device_attribute("key_frame_control")
     key_frame_bind_control_state = ControllerButtonBindingState.NONE
-    keyframe_insert_button_velocity_pressed = 0
+
+    # Optional journal of every received message, see start_journal/stop_journal
+    journal = MidiController_Journal()
+    # Replay of a journal or midi file into the input queue, see start_replay
+    replay = MidiController_Replay()
+    # Per stage latency histograms, only stamped while latency.enabled
+    latency = MidiController_Latency()
+    # Cost of the update ticks, only measured while profiler.enabled
+    profiler = MidiController_Profiler()
+    # What update runs every tick, in order, as (profiler subsystem, method).
+    update_steps = [
+        ("learn", "obj_prop_change_update"),
+        ("replay", "update_replay"),
+        ("midi", "parse_midi_messages_update"),
+        ("filters", "update_filters"),
+        ("tags", "flush_update_tags"),
+        ("frame", "frame_update"),
+        ("redraw", "flush_redraw_ui"),
+    ]
+
+    # Live performance recording, see start_recording/stop_recording
+    recorder = MidiController_Recorder()
+    record_objects = []
 
     # Selection group buttons bound
     selection_to_map = None
     select_group_bind_selection_state = ControllerButtonBindingState.NONE
-    controller_selection_mapping = {}
-    select_group_button_velocity_pressed = 0
-
-    # Frame position update
-    controllers_to_set_frame = {
-        "increase": {
-            "state": ControllerButtonBindingState.NONE,
-            "controller": None  # changes from the current frame into future frames
-        },
-        "decrease": {
-            "state": ControllerButtonBindingState.NONE,
-            # changes from the current frame into the past frames.
-            "controller": None
-        },
-        # this is the resolution of the control (127/5 = 25.4 = 25 frames starting from the current frame)
-        "frame_control_resolution": 5,
-        # this allows for the system ot change the last frame position to the newly changed after this amount of time seeing no changes.
-        "timeout": 1,
-    }
+    controller_selection_mapping = device_attribute("controller_selection_mapping")
+    # {(device name, control): (group, objects)} of the selection groups resolved this session.
+    selection_group_cache = {}
+
+    # Frame position update, see MidiController_Device.default_frame_control
+    controllers_to_set_frame = device_attribute("controllers_to_set_frame")
 
     controllers_to_set_frame_current_frame = 0
     controllers_to_set_frame_timeout = 1
 
     # midi update rate
     midi_update_rate = 0.08
+    # adaptive update rate, fast while controls are moving. Idle ticks stay at midi_update_rate,
+    # a tick with an empty queue costs next to nothing and a slower one delays the first move.
+    midi_update_rate_fast = 0.01
+    midi_active_timeout = 0.5
+    midi_last_activity_time = 0
+    frame_update_time = 0
 
     previous_object = None
     current_object = None
-    previous_object_data = {}
-    current_object_data = {}
-    accepted_types = ["<class 'int'>", "<class 'float'>",
-                      "<class 'list'>", "<class 'Vector'>", "<class 'IDPropertyArray'>"]
+    # Flat property values of the selected object and the slot describing each value,
+    # slots are (name, property, index, type, key).
+    previous_object_data = []
+    current_object_data = []
+    previous_object_custom_slots = []
+    # {type(obj): (paths, slots)}, built once from bl_rna.properties, see get_property_schema.
+    property_schema_cache = {}
+    max_property_array_length = 6
+    max_custom_properties = 400
+
+    # Event driven learn mode, msgbus reports changed rna properties of the learn object directly,
+    # depsgraph updates of that object trigger a full snapshot compare (custom props, viewport transforms).
+    learn_msgbus_owner = object()
+    learn_subscribed_object = None
+    learn_changed_properties = set()
+    learn_dirty = True
 
     # class for usage in timer to read midi input
 
+    def on_midi_message(self, event, device_index=0):
+        # Called from the rtmidi input thread of a device, do NOT touch bpy here!
+        self.midi_queue.append((event[0], event[1], time.perf_counter(), device_index))
+
+    def enable_input_callback(self, device):
+        if device.midi_input is None:
+            return
+        if self.use_input_callback:
+            device.midi_input.set_callback(self.on_midi_message, device.index)
+        else:
+            device.midi_input.cancel_callback()
+
+    def open_device(self, name, port, midi_input, virtual=False):
+        # Reuse the slot of a closed device, so reconnects and replays do not grow device_list.
+        index = self.device_list.index(None) if None in self.device_list else len(self.device_list)
+        device = MidiController_Device(name, port, midi_input, index, virtual)
+        if index == len(self.device_list):
+            self.device_list.append(device)
+        else:
+            self.device_list[index] = device
+        self.devices[name] = device
+        self.enable_input_callback(device)
+        if self.active_device is None or self.active_device.name not in self.devices:
+            self.set_active_device(name)
+        self.midi_open = True
+        return device
+
+    def set_active_device(self, name):
+        device = self.devices[name]
+        self.active_device = device
+        self.connected_controller = device.name
+        self.connected_port = device.port
+        self.midi_control_to_map = None
+        self.mapping_pending = None
+        self.current_mapping_state = self.State.NONE
+        self.editting_controller = None
+        self.edit_state = self.EditState.NONE
+
+    def close_device(self, name):
+        device = self.devices.get(name)
+        if device is None:
+            return
+        self.flush_save()
+        if len(self.devices) == 1:
+            self.close()
+            return
+        device.close()
+        self.devices.pop(name)
+        self.device_list[device.index] = None
+        while len(self.device_list) > 0 and self.device_list[-1] is None:
+            self.device_list.pop()
+        print(f"Closed midi controller: {name}")
+        if self.active_device is device:
+            self.set_active_device(next(iter(self.devices)))
+
+    def read_midi_messages(self):
+        messages = []
+        # The queue is also filled by replays when polling.
+        queue = self.midi_queue
+        while queue:
+            messages.append(queue.popleft())
+        if not self.use_input_callback:
+            for device in self.devices.values():
+                if device.midi_input is None:
+                    continue
+                data = device.midi_input.get_message()
+                while data is not None:
+                    messages.append((data[0], data[1], time.perf_counter(), device.index))
+                    data = device.midi_input.get_message()
+        if len(self.devices) > 1 or not self.use_input_callback:
+            # Merge the devices into one timestamp ordered stream.
+            messages.sort(key=lambda message: message[2])
+        return messages
+
+    def decode_midi_messages(self, messages):
+        # -> MidiController_Event tuples, decoded once per message.
+        decoded = []
+        device_list = self.device_list
+        count = len(device_list)
+        for message in messages:
+            index = message[3]
+            if index >= count or device_list[index] is None:
+                # Queued before its device closed.
+                continue
+            event = device_list[index].decoder.decode_message(message)
+            if event is not None:
+                decoded.append(event)
+        return decoded
+
+    def coalesce_midi_messages(self, events):
+        # Keep only the newest event per (device, routing key), ordered by when
+        # that newest event arrived, so every moved control is dispatched once.
+        # Notes and program changes are never coalesced, every press has to reach
+        # midi_callback. Neither are the edges of other controls going from 0 to
+        # above 0 or back, CC buttons often press and release within one tick.
+        newest = {}
+        coalesced = []
+        for event in events:
+            if event[0] in [MidiController_Event.NOTE_ON, MidiController_Event.NOTE_OFF,
+                            MidiController_Event.PROGRAM_CHANGE]:
+                coalesced.append(event)
+                continue
+            key = (event[5], MidiController_Event.key(event[0], event[1], event[2]))
+            previous = newest.get(key)
+            if previous is not None and (coalesced[previous][3] == 0) == (event[3] == 0):
+                coalesced[previous] = None
+            newest[key] = len(coalesced)
+            coalesced.append(event)
+        return [event for event in coalesced if event is not None]
+
     def parse_midi_messages_update(self):
         try:
-            if self.midi_input is not None and self.midi_input.is_port_open():
-                last_data = None
-                data = self.midi_input.get_message()
-                while data is not None and self.midi_input.is_port_open():
-                    last_data = data
-                    data = self.midi_input.get_message()
-                if last_data is not None:
-                    self.midi_callback(last_data)
-            else:
-                self.close()
+            for device in list(self.devices.values()):
+                if not device.is_open():
+                    self.close_device(device.name)
+            if self.midi_open:
+                messages = self.read_midi_messages()
+                if len(messages) > 0:
+                    if self.latency.enabled:
+                        self.record_read_latency(messages)
+                    if self.journal.map is not None:
+                        self.journal.write(messages, self.device_list)
+                    messages = self.decode_midi_messages(messages)
+                if self.recorder.recording:
+                    self.recorder.tick(bpy.context.screen.is_animation_playing,
+                                       bpy.context.scene.frame_current, time.perf_counter())
+                if len(messages) > 0:
+                    self.midi_last_activity_time = time.perf_counter()
+                    if self.recorder.active:
+                        self.record_midi_messages(messages)
+                    for event in self.coalesce_midi_messages(messages):
+                        self.midi_callback(event)
         except Exception as e:
             print("Failed reading from midi controller!")
             print(traceback.format_exc())
             print(e)
         return self.midi_update_rate
 
+    def record_read_latency(self, messages):
+        latency = self.latency
+        now = time.perf_counter()
+        latency.read_time = now
+        timer = latency.histograms["timer"]
+        for message in messages:
+            timer.record(now - message[2])
+
+    def build_property_schema(self, obj):
+        paths = []  # (property, array length, offset) in the order values are read.
+        slots = []
+        for prop in obj.bl_rna.properties:
+            if prop.is_readonly or prop.type not in ['FLOAT', 'INT']:
+                continue
+            identifier = prop.identifier
+            length = prop.array_length
+            if length == 0:
+                paths.append((identifier, 0, len(slots)))
+                if prop.type == 'FLOAT':
+                    slots.append((identifier, identifier, None, "<class 'float'>", False))
+                else:
+                    slots.append((identifier, identifier, None, "<class 'int'>", False))
+            elif prop.type == 'FLOAT' and length <= self.max_property_array_length and prop.array_dimensions[1] == 0:
+                paths.append((identifier, length, len(slots)))
+                for i in range(length):
+                    slots.append((f"{identifier}_{i}", identifier, i, "<class 'Vector'>", False))
+        return (paths, slots)
+
+    def get_property_schema(self, obj):
+        schema = self.property_schema_cache.get(type(obj))
+        if schema is None:
+            schema = self.build_property_schema(obj)
+            self.property_schema_cache[type(obj)] = schema
+        return schema
+
+    def on_learn_property_changed(self, identifier):
+        # msgbus notification, runs on the main thread.
+        self.learn_changed_properties.add(identifier)
+
+    def on_depsgraph_update(self, scene, depsgraph):
+        # Selection changes tag the scene, (un)linking objects tags their collections.
+        if depsgraph.id_type_updated('SCENE') or depsgraph.id_type_updated('COLLECTION'):
+            self.invalidate_targets()
+        if self.latency.write_time is not None:
+            self.latency.record("depsgraph", time.perf_counter() - self.latency.write_time)
+            self.latency.write_time = None
+        if self.learn_subscribed_object is None or self.learn_dirty:
+            return
+        for update in depsgraph.updates:
+            if isinstance(update.id, bpy.types.Object) and update.id.name == self.learn_subscribed_object:
+                self.learn_dirty = True
+                return
+
+    def subscribe_learn_object(self, obj):
+        self.unsubscribe_learn_object()
+        paths, slots = self.get_property_schema(obj)
+        for prop, length, offset in paths:
+            try:
+                bpy.msgbus.subscribe_rna(
+                    key=obj.path_resolve(prop, False),
+                    owner=self.learn_msgbus_owner,
+                    args=(prop,),
+                    notify=self.on_learn_property_changed)
+            except Exception as e:
+                print(f"Could not subscribe to: {prop}")
+        self.learn_subscribed_object = obj.name
+        self.learn_dirty = True
+
+    def unsubscribe_learn_object(self):
+        if self.learn_subscribed_object is not None:
+            bpy.msgbus.clear_by_owner(self.learn_msgbus_owner)
+            self.learn_subscribed_object = None
+        self.learn_changed_properties.clear()
+
+    def set_mapping_pending(self, slot, value):
+        self.mapping_pending = {
+            "index": slot[2],
+            "value": value,
+            "name": slot[0],
+            "property": slot[1],
+            "key": slot[4],
+            "data": False,
+            "type": slot[3],
+            "min": 0,
+            "max": 0
+        }
+        self.current_mapping_state = self.State.CONFIGURE_MAPPING
+
+    def compare_changed_properties(self, obj):
+        # Only read the properties msgbus reported, no full snapshot needed.
+        paths, slots = self.get_property_schema(obj)
+        changed = self.learn_changed_properties
+        self.learn_changed_properties = set()
+        for prop, length, offset in paths:
+            if prop not in changed:
+                continue
+            if length == 0:
+                values = [getattr(obj, prop)]
+            else:
+                values = getattr(obj, prop)
+            for i, value in enumerate(values):
+                if value != self.previous_object_data[offset + i]:
+                    self.previous_object_data[offset + i] = value
+                    if slots[offset + i][0] not in self.properties_to_skip:
+                        self.set_mapping_pending(slots[offset + i], value)
+
+    def read_custom_properties(self, obj, values):
+        # Custom properties differ per object, so these are not cached.
+        slots = []
+        for prop in obj.keys():
+            if prop == '_RNA_UI':
+                continue
+            value = obj[prop]
+            if isinstance(value, bool):
+                continue
+            if isinstance(value, (int, float)):
+                values.append(value)
+                slots.append((prop, prop, None, str(type(value)), True))
+            elif hasattr(value, "to_list"):
+                value = value.to_list()
+                if len(value) > self.max_property_array_length:
+                    continue
+                for i, v in enumerate(value):
+                    values.append(v)
+                    slots.append((f"{prop}_{i}", prop, i, "<class 'IDPropertyArray'>", True))
+        return slots
+
     def obj_prop_change_update(self):
         # print("Listening for property changes!")
         try:
             if bpy.context.screen.is_animation_playing:
                 return self.midi_update_rate
 
-            new_obj_template = {
-                "index": None,
-                "value": None,
-                "name": None,
-                "property": None,
-                "key": False,
-                "data": False,
-                "type": None,
-                "min": 0,
-                "max": 0
-            }
-
-            if self.current_mapping_state != self.State.NONE:
+            if self.current_mapping_state == self.State.NONE:
+                if self.learn_subscribed_object is not None:
+                    self.unsubscribe_learn_object()
+            else:
                 if len(bpy.context.selected_objects) == 0:
                     return self.midi_update_rate
 
@@ -151,149 +477,53 @@ class MidiController_Midi():
 
                 is_new = False
 
-                if self.previous_object != self.current_object:
+                if self.previous_object != self.current_object or self.learn_subscribed_object != self.current_object:
                     self.previous_object = obj.name
-                    self.previous_object_data = {}
-                    self.current_object_data = {}
+                    self.previous_object_data = []
+                    self.previous_object_custom_slots = []
+                    self.subscribe_learn_object(obj)
                     is_new = True
 
-                # default props
-                # print("attr in obj:")
-                # print(len(dir(obj)))
-                if len(dir(obj)) < 400:
-                    for prop in dir(obj):
-                        if str(type(getattr(obj, prop))) in self.accepted_types:
-                            if str(type(getattr(obj, prop))) in ["<class 'Vector'>"]:
-                                if len(getattr(obj, prop)) > 6:
-                                    print("attribute way to large, skipping")
-                                    continue
-                                for i, v in enumerate(getattr(obj, prop)):
-                                    if f"{prop}_{i}" in self.properties_to_skip:
-                                        continue
-                                    new_obj = copy.deepcopy(
-                                        new_obj_template)
-                                    new_obj["name"] = f"{prop}_{i}"
-                                    new_obj["property"] = prop
-                                    new_obj["data"] = False
-                                    new_obj["type"] = str(
-                                        type(getattr(obj, prop)))
-                                    new_obj['index'] = i
-                                    new_obj['value'] = v
-                                    self.current_object_data[f"{prop}_{i}"] = copy.copy(
-                                        new_obj)
-                            elif str(type(getattr(obj, prop))) in ["<class 'IDPropertyArray'>"]:
-                                if len(getattr(obj, prop).to_list()) > 6:
-                                    print("attribute way to large, skipping")
-                                    continue
-                                for i, v in enumerate(getattr(obj, prop).to_list()):
-                                    if f"{prop}_{i}" in self.properties_to_skip:
-                                        continue
-                                    new_obj = copy.deepcopy(
-                                        new_obj_template)
-                                    new_obj["name"] = f"{prop}_{i}"
-                                    new_obj["property"] = prop
-                                    new_obj["data"] = False
-                                    new_obj["type"] = str(
-                                        type(getattr(obj, prop)))
-                                    new_obj['index'] = i
-                                    new_obj['value'] = v
-                                    self.current_object_data[f"{prop}_{i}"] = copy.copy(
-                                        new_obj)
-                            else:
-                                if f"{prop}" in self.properties_to_skip:
-                                    continue
-                                new_obj = copy.deepcopy(new_obj_template)
-                                new_obj["name"] = f"{prop}"
-                                new_obj["property"] = prop
-                                new_obj["data"] = False
-                                new_obj["type"] = str(
-                                    type(getattr(obj, prop)))
-                                new_obj['value'] = getattr(obj, prop)
-                                self.current_object_data[f"{prop}"] = copy.copy(
-                                    new_obj)
-                    self.mapping_error = None
-                else:
-                    self.mapping_error = f"Failed parsing properties, too many!"
+                if not is_new:
+                    if len(self.learn_changed_properties) > 0:
+                        self.compare_changed_properties(obj)
+                    # Nothing happened to the object since the last snapshot.
+                    if not self.learn_dirty:
+                        return self.midi_update_rate
+                self.learn_dirty = False
+
+                paths, slots = self.get_property_schema(obj)
+                values = []
+                for prop, length, offset in paths:
+                    if length == 0:
+                        values.append(getattr(obj, prop))
+                    else:
+                        values.extend(getattr(obj, prop))
 
-                # custom props
-                if len(obj.keys()) > 1 and len(obj.keys()) < 400:
-                    # First item is _RNA_UI
-                    for K in obj.keys():
-                        if K not in '_RNA_UI':
-                            value = obj[K]
-                            prop = K
-                            if str(type(value)) in self.accepted_types:
-                                if str(type(value)) in ["<class 'Vector'>"]:
-                                    if len(value) > 6:
-                                        print(
-                                            "attribute way to large, skipping")
-                                        continue
-                                    for i, v in enumerate(value):
-                                        if f"{prop}_{i}" in self.properties_to_skip:
-                                            continue
-                                        new_obj = copy.deepcopy(
-                                            new_obj_template)
-                                        new_obj["name"] = f"{prop}_{i}"
-                                        new_obj["property"] = prop
-                                        new_obj["key"] = True
-                                        new_obj["data"] = False
-                                        new_obj['index'] = i
-                                        new_obj['value'] = v
-                                        new_obj["type"] = str(type(value))
-                                        self.current_object_data[f"prop_{i}"] = copy.copy(
-                                            new_obj)
-                                elif str(type(value)) in ["<class 'IDPropertyArray'>"]:
-                                    if len(value.to_list()) > 6:
-                                        print(
-                                            "attribute way to large, skipping")
-                                        continue
-                                    for i, v in enumerate(value.to_list()):
-                                        if f"{prop}_{i}" in self.properties_to_skip:
-                                            continue
-                                        new_obj = copy.deepcopy(
-                                            new_obj_template)
-                                        new_obj["name"] = f"{prop}_{i}"
-                                        new_obj["property"] = prop
-                                        new_obj["key"] = True
-                                        new_obj["data"] = False
-                                        new_obj['index'] = i
-                                        new_obj['value'] = v
-                                        new_obj["type"] = str(type(value))
-                                        self.current_object_data[f"prop_{i}"] = copy.copy(
-                                            new_obj)
-                                else:
-                                    if f"{prop}" in self.properties_to_skip:
-                                        continue
-                                    new_obj = copy.deepcopy(
-                                        new_obj_template)
-                                    new_obj["name"] = f"{prop}"
-                                    new_obj["property"] = prop
-                                    new_obj["key"] = True
-                                    new_obj["data"] = False
-                                    new_obj['value'] = value
-                                    new_obj["type"] = str(type(value))
-                                    self.current_object_data[prop] = copy.copy(
-                                        new_obj)
+                custom_slots = []
+                if len(obj.keys()) < self.max_custom_properties:
+                    custom_slots = self.read_custom_properties(obj, values)
                     self.mapping_error = None
                 else:
                     self.mapping_error = f"Failed parsing properties, too many!"
 
-                if self.previous_object == self.current_object and is_new == False:
-                    for key, value in self.current_object_data.items():
-                        if key in self.previous_object_data:
-                            if value['value'] != self.previous_object_data[key]['value']:
-                                self.mapping_pending = copy.copy(
-                                    value)
-                                self.current_mapping_state = self.State.CONFIGURE_MAPPING
-                        else:
-                            print(
-                                f"Key: {key} not in previous object, skipping compare.")
+                self.current_object_data = values
 
-                self.previous_object = copy.copy(
-                    self.current_object)
+                # Only compare when the same values were read in the same order.
+                if is_new == False and custom_slots == self.previous_object_custom_slots:
+                    for i, value in enumerate(values):
+                        if value != self.previous_object_data[i]:
+                            if i < len(slots):
+                                slot = slots[i]
+                            else:
+                                slot = custom_slots[i - len(slots)]
+                            if slot[0] in self.properties_to_skip:
+                                continue
+                            self.set_mapping_pending(slot, value)
+                            break
 
-                self.previous_object_data = copy.copy(
-                    self.current_object_data)
+                self.previous_object_custom_slots = custom_slots
+                self.previous_object_data = values
 
                 return self.midi_update_rate
         except Exception as e:
@@ -304,10 +534,38 @@ class MidiController_Midi():
 
         return self.midi_update_rate
 
+    def update(self):
+        """One tick of the update timer, returns the seconds until the next tick.
+        """
+        if self.profiler.enabled:
+            self.profiler.run(self, self.update_steps)
+        else:
+            for name, method in self.update_steps:
+                getattr(self, method)()
+        return self.next_update_interval()
+
+    def next_update_interval(self):
+        # None unregisters the timer, it is registered again when connecting a device.
+        if not self.midi_open:
+            return None
+        if self.current_mapping_state != self.State.NONE:
+            return self.midi_update_rate
+        if self.replay.active:
+            # FAST runs the next batch as soon as blender handled its events.
+            return 0 if self.replay.pacing == "FAST" else self.midi_update_rate_fast
+        since_activity = time.perf_counter() - self.midi_last_activity_time
+        if since_activity < self.midi_active_timeout or len(self.active_filters) > 0:
+            return self.midi_update_rate_fast
+        return self.midi_update_rate
+
     def frame_update(self):
-        if self.controllers_to_set_frame_timeout > self.midi_update_rate:
+        # The timer interval changes, so count down using the real elapsed time.
+        now = time.perf_counter()
+        elapsed = now - self.frame_update_time
+        self.frame_update_time = now
+        if self.controllers_to_set_frame_timeout > elapsed:
             self.controllers_to_set_frame_timeout = round(
-                self.controllers_to_set_frame_timeout - self.midi_update_rate, 3)
+                self.controllers_to_set_frame_timeout - elapsed, 3)
             self.redraw_ui()
         else:
             self.controllers_to_set_frame_current_frame = bpy.context.scene.frame_current
@@ -316,76 +574,422 @@ class MidiController_Midi():
                 self.redraw_ui()
 
     def redraw_ui(self):
-        if self.screens == None:
+        if self.latency.enabled and not self.ui_redraw_requested:
+            self.latency.redraw_request_time = time.perf_counter()
+        self.ui_redraw_requested = True
+
+    def redraw_view(self):
+        # Properties were written, the viewport shows them.
+        self.ui_redraw_view_requested = True
+        self.redraw_ui()
+
+    def flush_redraw_ui(self):
+        if not self.ui_redraw_requested:
+            return
+        now = time.perf_counter()
+        if now - self.ui_last_redraw_time < self.ui_redraw_interval:
             return
+        redraw_view = self.ui_redraw_view_requested
+        self.ui_redraw_requested = False
+        self.ui_redraw_view_requested = False
+        self.ui_last_redraw_time = now
+        if self.latency.redraw_request_time is not None:
+            self.latency.record("redraw", now - self.latency.redraw_request_time)
+            self.latency.redraw_request_time = None
         try:
-            for screen in self.screens:
-                for area in screen.areas:
-                    area.tag_redraw()
+            for window in bpy.context.window_manager.windows:
+                for area in window.screen.areas:
+                    if area.type != 'VIEW_3D':
+                        continue
+                    for region in area.regions:
+                        if region.type == 'UI' or (redraw_view and region.type == 'WINDOW'):
+                            region.tag_redraw()
         except Exception as e:
             print("Screen error")
 
-    def update_data(self, mapping, new_value):
-        for obj in bpy.context.selected_objects:
-            if mapping["key"]:
-                if mapping["property"] not in obj:
-                    continue
-                if mapping["type"] in ["<class 'Vector'>"]:
-                    obj[mapping["property"]][mapping["index"]
-                                             ] = float(new_value)
-                elif mapping["type"] in ["<class 'IDPropertyArray'>"]:
-                    obj[mapping["property"]][mapping["index"]
-                                             ] = float(new_value)
-                elif mapping["type"] in ["<class 'int'>"]:
-                    obj[mapping["property"]] = float(new_value)
-                elif mapping["type"] in ["<class 'float'>"]:
-                    obj[mapping["property"]] = float(new_value)
+    def make_mapping_converter(self, mapping):
+        # midi value with the given resolution (bits) -> property value, through the
+        # response curve baked into a table with an entry per value of the mapping resolution.
+        resolution = mapping.get("resolution", 7)
+        table = MidiController_Curves.bake(mapping)
+
+        def convert(value, bits=7):
+            if bits > resolution:
+                value = value >> (bits - resolution)
+            elif bits < resolution:
+                value = value << (resolution - bits)
+            return table[value]
+        return convert
+
+    def invalidate_targets(self):
+        self.target_cache.clear()
+
+    def get_selected_objects(self):
+        # bpy.context.selected_objects builds a new list on every access.
+        objects = self.target_cache.get(None)
+        if objects is None:
+            objects = list(bpy.context.selected_objects)
+            self.target_cache[None] = objects
+        return objects
+
+    def find_selection_group(self, device, name):
+        # -> (control, group) of the selection group of device with that name
+        for control, group in device.controller_selection_mapping.items():
+            if group["name"] == name:
+                return (control, group)
+        return (None, None)
+
+    def get_target_objects(self, device, mapping):
+        """Objects of the target selection group (of device) or collection of a mapping,
+        None when it writes to the selected objects. A group wins over a collection.
+        """
+        group_name = mapping.get("target_group", "")
+        collection_name = mapping.get("target_collection", "")
+        if group_name != "":
+            target = ("GROUP", device.name, group_name)
+        elif collection_name != "":
+            target = ("COLLECTION", collection_name)
+        else:
+            return None
+        objects = self.target_cache.get(target)
+        if objects is None:
+            if group_name != "":
+                control, group = self.find_selection_group(device, group_name)
+                objects = [] if group is None else list(self.resolve_selection_group(device, control, group))
+            else:
+                collection = bpy.data.collections.get(collection_name)
+                objects = [] if collection is None else list(collection.all_objects)
+            self.target_cache[target] = objects
+        return objects
+
+    def get_mapping_objects(self, mapping, selected_objects, device=None):
+        # Objects a mapping writes to, its target group or collection or the selected objects.
+        if device is None:
+            device = self.active_device
+        objects = self.get_target_objects(device, mapping)
+        if objects is None:
+            return selected_objects
+        return objects
+
+    def make_collection_array_writer(self, mapping):
+        # Writes one component of an array property of all collection members in
+        # a single foreach_get/foreach_set pass.
+        target = mapping["target_collection"]
+        prop = mapping["property"]
+        index = mapping["index"]
+        length = bpy.types.Object.bl_rna.properties[prop].array_length
+        buffers = {}
+
+        def write_value(objects, new_value):
+            collection = bpy.data.collections.get(target)
+            if collection is None:
+                return
+            members = collection.all_objects
+            count = len(members)
+            buffer = buffers.get(count)
+            if buffer is None:
+                buffers.clear()
+                buffer = numpy.empty(count * length, dtype=numpy.float32)
+                buffers[count] = buffer
+            members.foreach_get(prop, buffer)
+            buffer[index::length] = new_value
+            members.foreach_set(prop, buffer)
+            self.pending_update_tags[target] = members
+        return write_value
+
+    def flush_update_tags(self):
+        # foreach_set skips the rna update. Transforms are evaluated per object, tagging the
+        # collection does not re-evaluate its members, so every member still needs a tag,
+        # but only once per tick however many messages wrote the collection.
+        if len(self.pending_update_tags) == 0:
+            return
+        pending = self.pending_update_tags
+        self.pending_update_tags = {}
+        for target, members in pending.items():
+            try:
+                for obj in members:
+                    obj.update_tag(refresh={'OBJECT'})
+            except ReferenceError:
+                # Removed since it was written, nothing left to evaluate.
+                pass
+
+    def make_mapping_writer(self, mapping, device):
+        # -> write_value(selected objects, property value)
+        prop = mapping["property"]
+        index = mapping["index"]
+        is_array = mapping["type"] in ["<class 'Vector'>", "<class 'IDPropertyArray'>"]
+        target_group = mapping.get("target_group", "")
+        target_collection = mapping.get("target_collection", "")
+
+        if target_group == "" and target_collection != "" and is_array and not mapping["key"] \
+                and prop in self.collection_array_properties:
+            return self.make_collection_array_writer(mapping)
+
+        if mapping["key"]:
+            # Custom properties come and go without a depsgraph update, checked on every write.
+            if is_array:
+                def write(obj, new_value):
+                    if prop in obj:
+                        obj[prop][index] = new_value
+            else:
+                def write(obj, new_value):
+                    if prop in obj:
+                        obj[prop] = new_value
 
+            def with_property(objects):
+                return objects
+        else:
+            if is_array:
+                def write(obj, new_value):
+                    getattr(obj, prop)[index] = new_value
+            elif mapping["type"] in ["<class 'int'>"]:
+                def write(obj, new_value):
+                    setattr(obj, prop, int(new_value))
             else:
-                if hasattr(obj, mapping["property"]) == False:
-                    continue
-                if mapping["type"] in ["<class 'Vector'>"]:
-                    getattr(obj, mapping["property"])[
-                        mapping["index"]] = float(new_value)
-                elif mapping["type"] in ["<class 'IDPropertyArray'>"]:
-                    getattr(obj, mapping["property"])[
-                        mapping["index"]] = float(new_value)
-                elif mapping["type"] in ["<class 'int'>"]:
-                    setattr(obj, mapping["property"], int(new_value))
-                elif mapping["type"] in ["<class 'float'>"]:
-                    setattr(obj, mapping["property"], float(new_value))
-
-            # This refreshes it... for some reason.
-            # see: https://projects.blender.org/blender/blender/issues/74000
-            obj.hide_render = obj.hide_render
+                def write(obj, new_value):
+                    setattr(obj, prop, new_value)
+
+            # The objects of the last target list that have the property, the target lists
+            # are cached so hasattr only runs again when the targets changed.
+            filtered = [None, []]
+
+            def with_property(objects):
+                if filtered[0] is not objects:
+                    filtered[0] = objects
+                    filtered[1] = [obj for obj in objects if hasattr(obj, prop)]
+                return filtered[1]
+
+        def write_objects(objects, new_value):
+            for obj in with_property(objects):
+                write(obj, new_value)
+                # This refreshes it... for some reason.
+                # see: https://projects.blender.org/blender/blender/issues/74000
+                obj.hide_render = obj.hide_render
+
+        if target_group == "" and target_collection == "":
+            return write_objects
+
+        def write_value(objects, new_value):
+            write_objects(self.get_target_objects(device, mapping), new_value)
+        return write_value
+
+    def make_mapping_setter(self, mapping, device=None):
+        # -> setter(objects, midi value, bits), filtered mappings write from update_filters.
+        if device is None:
+            device = self.active_device
+        convert = self.make_mapping_converter(mapping)
+        write_value = self.make_mapping_writer(mapping, device)
+        value_filter = MidiController_Filter.from_mapping(mapping, write_value)
+
+        if value_filter is None:
+            def setter(objects, value, bits=7):
+                write_value(objects, convert(value, bits))
+            return setter
+
+        active_filters = self.active_filters
+
+        def filtered_setter(objects, value, bits=7):
+            if value_filter.set_target(convert(value, bits), time.perf_counter()):
+                active_filters.add(value_filter)
+        return filtered_setter
+
+    def update_filters(self):
+        # Once per tick, writes the filters that moved and drops the ones that settled.
+        if len(self.active_filters) == 0:
+            return
+        now = time.perf_counter()
+        objects = self.get_selected_objects()
+        for value_filter in list(self.active_filters):
+            try:
+                new_value = value_filter.step(now)
+                if new_value is not None:
+                    value_filter.write(objects, new_value)
+                    self.redraw_view()
+            except Exception as e:
+                print("Failed writing filtered value")
+                print(e)
+                value_filter.settled = True
+            if value_filter.settled:
+                self.active_filters.discard(value_filter)
+
+    def compile_mappings(self, device=None):
+        # Must be called after every change to controller_property_mapping.
+        if device is None:
+            device = self.active_device
+        compiled = {}
+        for controller, mapping_array in device.controller_property_mapping.items():
+            # Keys are MidiController_Event.key, as str because they are stored in json.
+            setters = []
+            for mapping in mapping_array:
+                try:
+                    setters.append(self.make_mapping_setter(mapping, device))
+                except Exception as e:
+                    print(f"Failed compiling mapping: {mapping}")
+                    print(e)
+            compiled[int(controller)] = setters
+        device.compiled_property_mapping = compiled
+
+    def update_data(self, setters, value, bits=7):
+        objects = self.get_selected_objects()
+        for setter in setters:
+            setter(objects, value, bits)
 
     def insert_keyframes(self):
-        for obj in bpy.context.selected_objects:
-            for controller, mapping_array in self.controller_property_mapping.items():
+        # One key per channel, nothing to simplify, the existing keys are left alone.
+        frame = float(bpy.context.scene.frame_current)
+        channels = {}
+        selected_objects = self.get_selected_objects()
+        for device, mapping in self.all_mappings():
+            for obj in self.get_mapping_objects(mapping, selected_objects, device):
+                channel = MidiController_Keyframes.resolve_channel(obj, mapping)
+                if channel is None:
+                    continue
+                data_path, index, value = channel
+                channels[(obj, data_path, index)] = ([frame], [value])
+        MidiController_Keyframes.insert(channels)
+
+    def all_mappings(self):
+        # -> (device, mapping) of every open device
+        for device in self.devices.values():
+            for mapping_array in device.controller_property_mapping.values():
                 for mapping in mapping_array:
+                    yield (device, mapping)
+
+    def start_journal(self, path, capacity=None):
+        try:
+            self.journal.open(path, capacity)
+        except Exception as e:
+            print(f"Failed opening midi journal: {path}")
+            print(e)
+            self.journal.close()
+
+    def stop_journal(self):
+        self.journal.close()
+
+    def start_replay(self, path, pacing="REALTIME", device_name=""):
+        """Replay a journal or midi file. Every device named in a journal replays into the
+        device with that name, or a virtual device with that name (and its stored settings)
+        when it is not connected. Midi files and journals without names replay into the
+        device device_name, the configured device by default.
+        """
+        device_names, entries = MidiController_Replay.load(path)
+        opened = []
+
+        def replay_device(name):
+            device = self.devices.get(name)
+            if device is None:
+                device = self.open_device(name, None, None, virtual=True)
+                self.load(device=device)
+                opened.append(name)
+            return device.index
+
+        self.stop_replay()
+        device_indices = {source: replay_device(name) for source, name in enumerate(device_names)}
+        default_index = 0
+        if any(entry[2] not in device_indices for entry in entries):
+            if device_name == "":
+                device_name = self.connected_controller if self.connected_controller != "" else "Replay"
+            default_index = replay_device(device_name)
+        self.replay.opened_devices = opened
+        self.replay.start(entries, device_indices, default_index, pacing, time.perf_counter())
+        print(f"Replaying {len(entries)} messages from: {path}")
+        return len(entries)
+
+    def update_replay(self):
+        # Once per tick, before parse_midi_messages_update reads the queue.
+        replay = self.replay
+        if replay.active:
+            if replay.pacing == "REALTIME":
+                replay.pump(self.midi_queue, time.perf_counter())
+            elif replay.pacing == "FRAME":
+                scene = bpy.context.scene
+                replay.step(self.midi_queue, scene.render.fps_base / scene.render.fps)
+                scene.frame_set(scene.frame_current + 1)
+            else:
+                replay.step_batch(self.midi_queue, replay.fast_batch)
+        elif len(replay.opened_devices) > 0 and len(self.midi_queue) == 0:
+            self.stop_replay()
+
+    def stop_replay(self):
+        self.replay.stop()
+        opened = self.replay.opened_devices
+        self.replay.opened_devices = []
+        for name in opened:
+            if name in self.devices:
+                self.close_device(name)
+
+    def run_replay(self):
+        """Run the started replay to the end without the update timer, for blender -b.
+        """
+        replay = self.replay
+        while replay.active or len(self.midi_queue) > 0:
+            if replay.pacing == "REALTIME" and replay.active:
+                next_time = replay.next_time()
+                wait = replay.start_time + next_time - time.perf_counter()
+                if wait > 0:
+                    time.sleep(min(wait, self.midi_update_rate_fast))
+            self.update_replay()
+            self.parse_midi_messages_update()
+            self.update_filters()
+            self.flush_update_tags()
+        # Let the filters settle.
+        while len(self.active_filters) > 0:
+            time.sleep(self.midi_update_rate_fast)
+            self.update_filters()
+            self.flush_update_tags()
+        self.stop_replay()
+
+    def start_recording(self):
+        scene = bpy.context.scene
+        self.record_objects = list(self.get_selected_objects())
+        self.recorder.start(scene.render.fps / scene.render.fps_base)
+
+    def record_midi_messages(self, events):
+        # Every event is recorded (not only the coalesced ones), at constant cost per event.
+        device_list = self.device_list
+        recorder = self.recorder
+        for event in events:
+            key = device_list[event[5]].find_mapping_key(
+                MidiController_Event.key(event[0], event[1], event[2]))
+            if key is not None:
+                # Stored as 14-bit so every resolution shares one buffer per control.
+                recorder.record((event[5], key), event[3] << (14 - event[6]), event[4])
+
+    def stop_recording(self):
+        recorded = self.recorder.stop()
+        channels = {}
+        for (device_index, control), (frames, raw_values) in recorded.items():
+            device = self.device_list[device_index] if device_index < len(self.device_list) else None
+            if device is None:
+                # Closed while recording.
+                continue
+            mappings = device.controller_property_mapping
+            for mapping in mappings.get(str(control), []):
+                convert = self.make_mapping_converter(mapping)
+                values = [convert(int(value), 14) for value in raw_values]
+                mapping_frames = frames
+                if mapping.get("simplify_tolerance", 0) > 0:
+                    mapping_frames, values = MidiController_Keyframes.simplify(
+                        frames, values, mapping["simplify_tolerance"])
+                for obj in self.get_mapping_objects(mapping, self.record_objects, device):
                     try:
-                        if mapping["type"] in ["<class 'Vector'>", "<class 'IDPropertyArray'>"]:
-                            if mapping['key']:
-                                obj.keyframe_insert(
-                                    f'["{mapping["property"]}"]', index=mapping['index'])
-                            else:
-                                obj.keyframe_insert(
-                                    mapping['property'], index=mapping['index'])
-                        elif mapping["type"] in ["<class 'int'>", "<class 'float'>"]:
-                            if mapping['key']:
-                                obj.keyframe_insert(
-                                    f'["{mapping["property"]}"]')
-                            else:
-                                obj.keyframe_insert(mapping['property'])
-                    except Exception as e:
-                        print(e)
-                        print(
-                            "Ugly but functional way to skip properties that are not part of the selected object")
-
-    def control_frame(self, direction, raw_value):
-        self.controllers_to_set_frame_timeout = self.controllers_to_set_frame["timeout"]
+                        channel = MidiController_Keyframes.resolve_channel(obj, mapping)
+                    except ReferenceError:
+                        continue
+                    if channel is None:
+                        continue
+                    data_path, index, value = channel
+                    channels[(obj, data_path, index)] = (mapping_frames, values)
+        self.record_objects = []
+        # The take replaces the keys that were in its span, old keys between the samples would spike.
+        return MidiController_Keyframes.insert(channels, replace_span=True)
+
+    def control_frame(self, direction, raw_value, frame_control=None):
+        if frame_control is None:
+            frame_control = self.controllers_to_set_frame
+        self.controllers_to_set_frame_timeout = frame_control["timeout"]
         frames_to_add = int(
-            raw_value / self.controllers_to_set_frame["frame_control_resolution"] + 0.5)
+            raw_value / frame_control["frame_control_resolution"] + 0.5)
         try:
             if direction == "increase":
                 new_frame = self.controllers_to_set_frame_current_frame + frames_to_add
@@ -403,196 +1007,273 @@ class MidiController_Midi():
             print("Failed updating frame somehow...")
             print(e)
 
-    def save(self, external=False):
-        to_save = {
-            "controller_names": self.controller_names,
-            "controller_mapping": self.controller_property_mapping,
-            "selection_groups": {
-                "mapping": self.controller_selection_mapping,
-                "velocity": self.select_group_button_velocity_pressed
-            },
-            "controller_keyframe_bind": {
-                "mapping": self.key_frame_control,
-                "velocity": self.keyframe_insert_button_velocity_pressed
-            },
-            "frame_control": self.controllers_to_set_frame
-        }
-
+    def save(self, external=False, device=None):
+        # external: returns the settings of all stored devices as json for exporting.
+        # Otherwise the section of the device (the configured one by default) is marked
+        # dirty and written by flush_save, debounced so a burst of edits results in one write.
+        if external:
+            self.flush_save()
+            storage = MidiController_Storage.get()
+            return json.dumps({device.name: MidiController_Storage.read_device(device)
+                               for device in storage.devices}, indent=4)
+        if device is None:
+            device = self.active_device
+        if device.name in self.devices:
+            self.dirty_sections.add(device.name)
+        if not self.save_scheduled:
+            self.save_scheduled = True
+            bpy.app.timers.register(
+                self.flush_save_timer, first_interval=self.save_debounce)
+
+    def flush_save_timer(self):
+        self.save_scheduled = False
+        self.flush_save()
+        return None
+
+    def flush_save(self):
+        self.sync_selection_group_names()
+        if len(self.dirty_sections) == 0:
+            return
         try:
-            self.loaded_json[self.connected_controller] = to_save
-            if external:
-                return json.dumps(self.loaded_json, indent=4)
-            else:
-                if bpy.data.texts.get("midicontrol") == None:
-                    bpy.data.texts.new("midicontrol")
-                bpy.data.texts["midicontrol"].clear()
-                bpy.data.texts["midicontrol"].write(
-                    json.dumps(self.loaded_json, indent=4))
+            storage = MidiController_Storage.get()
+            for name in self.dirty_sections:
+                if name in self.devices:
+                    MidiController_Storage.write_device(
+                        storage, name, self.devices[name].to_save())
+            self.dirty_sections.clear()
         except Exception as e:
             print(e)
 
-    def load(self, external=False, external_json=None):
+    def load(self, external=False, external_json=None, device=None):
+        # Every opened device loads its own section of the stored settings, only device when
+        # given (a device that just opened). external imports a json export into the storage
+        # first, overwriting the devices it contains.
         print(f"Loading external: {external}")
         try:
-            if bpy.data.texts.get("midicontrol") == None and external == False:
-                print("Nothing stored :(")
-                self.save()
-            else:
-                if external:
-                    self.loaded_json = json.load(external_json)
-                    if self.connected_controller not in self.loaded_json:
-                        self.save()
-                    print(f"Loaded: {self.loaded_json}")
-                else:
-                    self.loaded_json = json.loads(
-                        bpy.data.texts.get("midicontrol").as_string())
-                    if self.connected_controller not in self.loaded_json:
-                        self.save()
-                    print(f"Loaded: {self.loaded_json}")
-
-                loaded = self.loaded_json[self.connected_controller]
-                try:
-                    self.controller_names = loaded["controller_names"]
-                except Exception as e:
-                    print(f"Failed reading: controller_names")
-                try:
-                    self.controller_property_mapping = loaded["controller_mapping"]
-                except Exception as e:
-                    print(f"Failed reading: controller_mapping")
-
-                try:
-                    self.controller_selection_mapping = loaded["selection_groups"]["mapping"]
-                except Exception as e:
-                    print(f"Failed reading: selection_groups->mapping")
-                try:
-                    self.select_group_button_velocity_pressed = loaded[
-                        "selection_groups"]["velocity"]
-                except Exception as e:
-                    print(f"Failed reading: selection_groups->velocity")
-                try:
-                    self.select_group_bind_selection_state = self.ControllerButtonBindingState.NONE
-                except Exception as e:
-                    print(f"Failed reading: selection_groups->state")
-
-                try:
-                    self.key_frame_control = loaded["controller_keyframe_bind"]["mapping"]
-                except Exception as e:
-                    print(f"Failed reading: controller_keyframe_bind->mapping")
-                try:
-                    self.keyframe_insert_button_velocity_pressed = loaded[
-                        "controller_keyframe_bind"]["velocity"]
-                except Exception as e:
-                    print(f"Failed reading: controller_keyframe_bind->velocity")
-                try:
-                    self.select_group_bind_selection_state = self.ControllerButtonBindingState.NONE
-                except Exception as e:
-                    print(f"Failed reading: controller_keyframe_bind->state")
-
-                try:
-                    self.controllers_to_set_frame = loaded["frame_control"]
-                except Exception as e:
-                    print(f"Failed reading: frame_control")
-
-                if external:
-                    # Make sure that external overwrites the internal configuration.
-                    self.save(external=False)
+            # Pending edits of open devices would be overwritten by the stored sections.
+            self.flush_save()
+            storage = MidiController_Storage.get()
+            if external:
+                self.import_json(storage, json.load(external_json))
+            elif len(storage.devices) == 0 and bpy.data.texts.get("midicontrol") is not None:
+                # Files saved before the settings moved to the storage.
+                print("Importing settings from the midicontrol text")
+                self.import_json(storage, json.loads(
+                    bpy.data.texts.get("midicontrol").as_string()))
+
+            devices = list(self.devices.values()) if device is None else [device]
+            for device in devices:
+                stored = MidiController_Storage.find_device(storage, device.name)
+                if stored is None:
+                    print(f"Nothing stored for: {device.name}")
+                    self.dirty_sections.add(device.name)
+                    continue
+                device.load_section(MidiController_Storage.read_device(stored))
+                self.compile_mappings(device)
+            self.select_group_bind_selection_state = self.ControllerButtonBindingState.NONE
+            self.invalidate_targets()
+            self.flush_save()
 
         except Exception as e:
             print("failed load ;(")
             print(e)
 
+    def import_json(self, storage, loaded_json):
+        for name, section in loaded_json.items():
+            try:
+                if section.get("version", 1) < MidiController_Device.version:
+                    section = MidiController_Device.migrate_section(section)
+                MidiController_Storage.write_device(storage, name, section)
+            except Exception as e:
+                print(f"Failed importing: {name}")
+                print(e)
+
+    def resolve_selection_group(self, device, control, group):
+        """Objects of a selection group, cached until one of them is removed.
+
+        Members are found by session_uid, so renamed objects stay in the group and the
+        stored names follow the renames. Groups loaded from the file have no session uids
+        yet (they do not survive reloading), those are resolved by name once.
+        """
+        cached = self.selection_group_cache.get((device.name, control))
+        if cached is not None and cached[0] is group:
+            try:
+                if all(obj.session_uid == uid for obj, uid in zip(cached[1], group["session_uids"])):
+                    return cached[1]
+            except ReferenceError:
+                pass
+
+        names = group["selected_objects"] or []
+        objects = None
+        uids = group.get("session_uids")
+        if uids is not None:
+            by_uid = {obj.session_uid: obj for obj in bpy.data.objects}
+            found = [by_uid.get(uid) for uid in uids]
+            if None not in found:
+                objects = found
+                renamed = [obj.name for obj in objects]
+                if len(uids) == len(names) and renamed != names:
+                    group["selected_objects"] = renamed
+                    self.save(device=device)
+        if objects is None:
+            objects = [bpy.data.objects[name] for name in names if name in bpy.data.objects]
+            group["session_uids"] = [obj.session_uid for obj in objects]
+        self.selection_group_cache[(device.name, control)] = (group, objects)
+        return objects
+
+    def sync_selection_group_names(self):
+        # Renamed members of resolved groups, so the stored names still find them after reloading.
+        for (device_name, control), (group, objects) in self.selection_group_cache.items():
+            try:
+                names = [obj.name for obj in objects]
+            except ReferenceError:
+                continue
+            stored = group["selected_objects"] or []
+            if len(names) == len(stored) and names != stored:
+                group["selected_objects"] = names
+                if device_name in self.devices:
+                    self.dirty_sections.add(device_name)
+
     def select_objects(self, objects):
-        bpy.ops.object.select_all(action='DESELECT')
-        for objname in objects:
-            bpy.data.objects[objname].select_set(True)
-
-    def midi_callback(self, midi_data):
-        velocity = midi_data[0][0]
-        control = midi_data[0][1]
-        value = midi_data[0][2]
-
-        if velocity != self.midi_last_control_velocity:
-            if self.key_frame_bind_control_state == self.ControllerButtonBindingState.PENDING:
-                self.key_frame_control = control
-                self.keyframe_insert_button_velocity_pressed = velocity
+        # Only the objects whose selection changes are touched, no operator (undo push, context) needed.
+        uids = {obj.session_uid for obj in objects}
+        for obj in bpy.context.selected_objects:
+            if obj.session_uid not in uids:
+                obj.select_set(False)
+        for obj in objects:
+            try:
+                if not obj.select_get():
+                    obj.select_set(True)
+            except RuntimeError:
+                # Not in the view layer.
+                pass
+        self.invalidate_targets()
+
+    def midi_callback(self, event):
+        latency = self.latency if self.latency.enabled else None
+        if latency is not None:
+            dispatch_time = time.perf_counter()
+            latency.record("dispatch", dispatch_time - latency.read_time)
+        device = self.device_list[event[5]]
+        key = MidiController_Event.key(event[0], event[1], event[2])
+        # Bindings on OMNI_CHANNEL (and the ones migrated from unversioned settings) match every channel.
+        omni_key = MidiController_Event.omni_key(key)
+        value = event[3]
+        bits = event[6]
+        # Binding and learning only listen to the device that is being configured.
+        configuring = device is self.active_device
+
+        if MidiController_Event.is_press(event, device.last_values.get(key)):
+            if configuring and self.key_frame_bind_control_state == self.ControllerButtonBindingState.PENDING:
+                device.key_frame_control = key
                 # self.save_to_blend()
                 self.key_frame_bind_control_state = self.ControllerButtonBindingState.BOUND
 
-            elif self.select_group_bind_selection_state == self.ControllerButtonBindingState.PENDING:
+            elif configuring and self.select_group_bind_selection_state == self.ControllerButtonBindingState.PENDING:
                 new_selection_mapping = {
                     "name": self.selection_to_map["name"],
                     "selected_objects": self.selection_to_map["selected"],
-                    "velocity": velocity
+                    "session_uids": self.selection_to_map["session_uids"]
                 }
-                self.controller_selection_mapping[str(
-                    control)] = new_selection_mapping
-                self.select_group_button_velocity_pressed = velocity
+                device.controller_selection_mapping[str(key)] = new_selection_mapping
+                self.invalidate_targets()
+                # Mappings pick their target group from the stored groups.
+                self.save(device=device)
 
                 self.select_group_bind_selection_state = self.ControllerButtonBindingState.BOUND
 
-            elif self.key_frame_bind_control_state == self.ControllerButtonBindingState.BOUND and \
-                    velocity == self.keyframe_insert_button_velocity_pressed and \
-                    self.key_frame_control == control:
+            elif device.key_frame_control == key or device.key_frame_control == omni_key:
                 self.insert_keyframes()
 
                 # self.save_to_blend()
-            elif self.select_group_bind_selection_state == self.ControllerButtonBindingState.BOUND and \
-                    velocity == self.select_group_button_velocity_pressed:
-                if str(control) in self.controller_selection_mapping:
-                    self.select_objects(
-                        self.controller_selection_mapping[str(control)]["selected_objects"])
-
-            self.midi_last_control_velocity = velocity
+            else:
+                group_key = device.find_selection_key(key)
+                if group_key is not None:
+                    self.select_objects(self.resolve_selection_group(
+                        device, group_key, device.controller_selection_mapping[group_key]))
 
-        if value != self.midi_last_control_value:
-            self.midi_last_control_changed = control
-            self.midi_last_control_value = value
+        frame_control = device.controllers_to_set_frame
+        if value != device.last_values.get(key):
             self.redraw_ui()
 
-            found = (str(control) in self.controller_property_mapping.keys())
-            if found == False:
-                self.midi_control_to_map = control
-            else:
-                for mapping in self.controller_property_mapping[str(control)]:
-                    min = mapping["min"]
-                    max = mapping["max"]
-                    new_value = (((max - min) / 127) * value) + min
-                    self.update_data(mapping, new_value)
-                self.midi_control_to_map = control
-
-            if self.controllers_to_set_frame["increase"]["state"] == self.ControllerButtonBindingState.PENDING:
-                self.controllers_to_set_frame["increase"]["controller"] = control
-                self.controllers_to_set_frame["increase"]["state"] = self.ControllerButtonBindingState.BOUND
-            elif self.controllers_to_set_frame["increase"]["controller"] == control:
-                self.control_frame("increase", value)
-
-            if self.controllers_to_set_frame["decrease"]["state"] == self.ControllerButtonBindingState.PENDING:
-                self.controllers_to_set_frame["decrease"]["controller"] = control
-                self.controllers_to_set_frame["decrease"]["state"] = self.ControllerButtonBindingState.BOUND
-            elif self.controllers_to_set_frame["decrease"]["controller"] == control:
-                self.control_frame("decrease", value)
-
-            self.midi_last_control_value = value
-        self.midi_last_control_changed = control
+            setters = device.find_setters(key)
+            if setters is not None:
+                self.update_data(setters, value, bits)
+                self.redraw_view()
+                if latency is not None:
+                    written_time = time.perf_counter()
+                    latency.record("write", written_time - dispatch_time)
+                    latency.record("total", written_time - event[4])
+                    if latency.write_time is None:
+                        latency.write_time = written_time
+
+            if configuring:
+                self.midi_control_to_map = key
+                self.midi_control_to_map_bits = bits
+
+            if configuring and frame_control["increase"]["state"] == self.ControllerButtonBindingState.PENDING:
+                frame_control["increase"]["controller"] = key
+                frame_control["increase"]["state"] = self.ControllerButtonBindingState.BOUND
+            elif frame_control["increase"]["controller"] in (key, omni_key):
+                self.control_frame("increase", value >> (bits - 7), frame_control)
+
+            if configuring and frame_control["decrease"]["state"] == self.ControllerButtonBindingState.PENDING:
+                frame_control["decrease"]["controller"] = key
+                frame_control["decrease"]["state"] = self.ControllerButtonBindingState.BOUND
+            elif frame_control["decrease"]["controller"] in (key, omni_key):
+                self.control_frame("decrease", value >> (bits - 7), frame_control)
+
+            device.last_values[key] = value
+        self.midi_last_control_changed = key
+        self.midi_last_control_value = value
+        self.midi_last_device = device.name
         self.redraw_ui()
 
-    def close(self):
+    def close(self, discard=False):
+        # discard: after loading another file, the take and unsaved edits belong to the
+        # previous file and are dropped. Otherwise they are kept while the devices still exist.
         if self.midi_open:
-            if self.midi_input.is_port_open():
-                self.midi_input.close_port()
-            self.midi_input.delete()
-            print(
-                f"Closed midi controller: {self.connected_controller}")
+            if discard:
+                self.recorder.stop()
+                self.record_objects = []
+            else:
+                if self.recorder.recording:
+                    self.stop_recording()
+                self.flush_save()
+            for device in self.devices.values():
+                device.close()
+                print(
+                    f"Closed midi controller: {device.name}")
+            if self.midi_input is not None:
+                if self.midi_input.is_port_open():
+                    self.midi_input.close_port()
+                self.midi_input.delete()
+            self.devices = {}
+            self.device_list = []
+            self.active_device = MidiController_Device("")
             self.connected_controller = ""
             self.connected_port = None
             self.available_ports = None
             self.midi_input = None
             self.midi_open = False
             self.midi = None
-            self.midi_last_control_changed = 0
+            self.midi_last_control_changed = None
             self.midi_last_control_value = 0
-            self.midi_last_control_velocity = 0
             self.midi_control_to_map = None
+            self.midi_queue.clear()
+            self.active_filters.clear()
+            self.pending_update_tags = {}
+            self.stop_journal()
+            self.replay.stop()
+            self.replay.opened_devices = []
+            self.latency.write_time = None
+            self.latency.redraw_request_time = None
+            self.selection_group_cache = {}
+            self.invalidate_targets()
+            self.dirty_sections.clear()
+            self.save_scheduled = False
+            self.unsubscribe_learn_object()
+            self.previous_object = None
 
             # settings
             self.loaded_from_blend = False
@@ -601,7 +1282,8 @@ class MidiController_Midi():
             self.current_mapping_state = self.State.NONE
 
             # To interact/update ui
-            self.screens = None
+            self.ui_redraw_requested = False
+            self.ui_redraw_view_requested = False
 
             # To interact/update objects
             self.context = None
@@ -614,8 +1296,197 @@ class MidiController_Midi():
             self.edit_state = self.EditState.NONE
 
             # Controller to register keyframe(s) (note: all properties)
-            self.key_frame_control = None
+            self.key_frame_bind_control_state = self.ControllerButtonBindingState.NONE
 
             # Selection group buttons bound
             self.selection_to_map = None
-            self.bind_selection_state = self.ControllerButtonBindingState.NONE
+            self.select_group_bind_selection_state = self.ControllerButtonBindingState.NONE
+
+
+class MidiController_Device():
+    """One opened midi input and its own section of the stored settings.
+    """
+    # Version of the stored settings section, see migrate_section.
+    version = 2
+
+    def __init__(self, name, port=None, midi_input=None, index=0, virtual=False):
+        self.name = name
+        self.port = port
+        self.midi_input = midi_input
+        # Virtual devices have no input, their messages are put in the queue by a replay.
+        self.virtual = virtual
+        # Position in MidiController_Midi.device_list, tags the queued messages.
+        self.index = index
+        self.decoder = MidiController_Decoder()
+        # {routing key: last value}, to only dispatch changes and detect button presses.
+        self.last_values = {}
+
+        # settings
+        # Merge 14-bit CC pairs, NRPN/RPN and pitch bend into 14-bit values, see MidiController_Decoder.
+        self.high_resolution = False
+        self.controller_names = {}
+        self.controller_property_mapping = {}
+        self.compiled_property_mapping = {}
+        self.controller_selection_mapping = {}
+        self.key_frame_control = None
+        self.controllers_to_set_frame = MidiController_Device.default_frame_control()
+
+    def default_frame_control():
+        return {
+            "increase": {
+                "state": MidiController_Midi.ControllerButtonBindingState.NONE,
+                "controller": None  # changes from the current frame into future frames
+            },
+            "decrease": {
+                "state": MidiController_Midi.ControllerButtonBindingState.NONE,
+                # changes from the current frame into the past frames.
+                "controller": None
+            },
+            # this is the resolution of the control (127/5 = 25.4 = 25 frames starting from the current frame)
+            "frame_control_resolution": 5,
+            # this allows for the system ot change the last frame position to the newly changed after this amount of time seeing no changes.
+            "timeout": 1,
+        }
+
+    def find_mapping_key(self, key):
+        # Mappings on a channel win over mappings on OMNI_CHANNEL.
+        if key in self.compiled_property_mapping:
+            return key
+        key = MidiController_Event.omni_key(key)
+        if key in self.compiled_property_mapping:
+            return key
+        return None
+
+    def find_selection_key(self, key):
+        # -> key (str) of the selection group bound to key, on its channel or OMNI_CHANNEL.
+        mapping = self.controller_selection_mapping
+        if len(mapping) == 0:
+            return None
+        if str(key) in mapping:
+            return str(key)
+        key = str(MidiController_Event.omni_key(key))
+        if key in mapping:
+            return key
+        return None
+
+    def find_setters(self, key):
+        setters = self.compiled_property_mapping.get(key)
+        if setters is None:
+            setters = self.compiled_property_mapping.get(MidiController_Event.omni_key(key))
+        return setters
+
+    def set_high_resolution(self, enabled):
+        self.high_resolution = enabled
+        self.decoder.high_resolution = enabled
+        self.decoder.reset()
+
+    def is_open(self):
+        if self.virtual:
+            return True
+        return self.midi_input is not None and self.midi_input.is_port_open()
+
+    def close(self):
+        if self.midi_input is None:
+            return
+        self.midi_input.cancel_callback()
+        if self.midi_input.is_port_open():
+            self.midi_input.close_port()
+        self.midi_input.delete()
+        self.midi_input = None
+
+    def to_save(self):
+        return {
+            "version": MidiController_Device.version,
+            "high_resolution": self.high_resolution,
+            "controller_names": self.controller_names,
+            "controller_mapping": self.controller_property_mapping,
+            "selection_groups": {
+                "mapping": self.controller_selection_mapping
+            },
+            "controller_keyframe_bind": {
+                "mapping": self.key_frame_control
+            },
+            "frame_control": self.controllers_to_set_frame
+        }
+
+    def load_section(self, loaded):
+        if loaded.get("version", 1) < 2:
+            loaded = MidiController_Device.migrate_section(loaded)
+        self.set_high_resolution(loaded.get("high_resolution", False))
+        try:
+            self.controller_names = loaded["controller_names"]
+        except Exception as e:
+            print(f"Failed reading: controller_names")
+        try:
+            self.controller_property_mapping = loaded["controller_mapping"]
+        except Exception as e:
+            print(f"Failed reading: controller_mapping")
+
+        try:
+            self.controller_selection_mapping = loaded["selection_groups"]["mapping"]
+        except Exception as e:
+            print(f"Failed reading: selection_groups->mapping")
+
+        try:
+            self.key_frame_control = loaded["controller_keyframe_bind"]["mapping"]
+        except Exception as e:
+            print(f"Failed reading: controller_keyframe_bind->mapping")
+
+        try:
+            self.controllers_to_set_frame = loaded["frame_control"]
+            for direction in ["increase", "decrease"]:
+                bound = self.controllers_to_set_frame[direction]["controller"] is not None
+                self.controllers_to_set_frame[direction]["state"] = \
+                    MidiController_Midi.ControllerButtonBindingState.BOUND if bound else \
+                    MidiController_Midi.ControllerButtonBindingState.NONE
+        except Exception as e:
+            print(f"Failed reading: frame_control")
+
+    def migrate_section(loaded):
+        # Version 1 stored data1 numbers (and the status byte of buttons as "velocity"),
+        # version 2 stores MidiController_Event keys.
+        print("Migrating stored midi settings to typed events")
+        migrated = copy.deepcopy(loaded)
+        try:
+            migrated["controller_names"] = {
+                str(MidiController_Event.migrate_legacy_control(control)): name
+                for control, name in loaded["controller_names"].items()}
+        except Exception as e:
+            print(f"Failed migrating: controller_names")
+        try:
+            migrated["controller_mapping"] = {
+                str(MidiController_Event.migrate_legacy_control(control)): mapping
+                for control, mapping in loaded["controller_mapping"].items()}
+        except Exception as e:
+            print(f"Failed migrating: controller_mapping")
+        try:
+            groups = migrated["selection_groups"]
+            mapping = {}
+            for control, group in groups["mapping"].items():
+                status = group.pop("velocity", groups.get("velocity", 0))
+                mapping[str(MidiController_Event.migrate_legacy_button(control, status))] = group
+            migrated["selection_groups"] = {"mapping": mapping}
+        except Exception as e:
+            print(f"Failed migrating: selection_groups")
+        try:
+            bind = loaded["controller_keyframe_bind"]
+            if bind["mapping"] is not None:
+                bind = {"mapping": MidiController_Event.migrate_legacy_button(
+                    bind["mapping"], bind.get("velocity", 0))}
+            migrated["controller_keyframe_bind"] = bind
+        except Exception as e:
+            print(f"Failed migrating: controller_keyframe_bind")
+        try:
+            for direction in ["increase", "decrease"]:
+                controller = loaded["frame_control"][direction]["controller"]
+                if controller is not None:
+                    migrated["frame_control"][direction]["controller"] = \
+                        MidiController_Event.migrate_legacy_control(controller)
+        except Exception as e:
+            print(f"Failed migrating: frame_control")
+        migrated["version"] = MidiController_Device.version
+        return migrated
+
+
+# Placeholder until a device is opened, keeps the device_attribute properties readable.
+MidiController_Midi.active_device = MidiController_Device("")
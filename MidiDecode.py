@@ -0,0 +1,220 @@
+"""
+Decodes raw midi messages into typed events: notes, CC (with 14-bit pairs), NRPN/RPN,
+pitch bend, aftertouch and program change.
+"""
+
+
+class MidiController_Event:
+    """Events are tuples of (type, channel, number, value, timestamp, device index, bits).
+
+    Routing uses key(type, channel, number), an int, so the same number on another
+    channel or of another type never collides. OMNI_CHANNEL keys match every channel.
+    Note offs are decoded as a NOTE_ON of value 0, so a note is one control that is
+    learned, mapped and released on the NOTE_ON key.
+    """
+    TYPE = 0
+    CHANNEL = 1
+    NUMBER = 2
+    VALUE = 3
+    TIMESTAMP = 4
+    DEVICE = 5
+    BITS = 6
+
+    # The types of channel messages are their status nibble.
+    NOTE_OFF = 0x8
+    NOTE_ON = 0x9
+    POLY_AFTERTOUCH = 0xA
+    CONTROL_CHANGE = 0xB
+    PROGRAM_CHANGE = 0xC
+    CHANNEL_AFTERTOUCH = 0xD
+    PITCH_BEND = 0xE
+    NRPN = 0x10
+    RPN = 0x11
+
+    OMNI_CHANNEL = 16
+
+    type_names = {
+        NOTE_OFF: "Note Off",
+        NOTE_ON: "Note",
+        POLY_AFTERTOUCH: "Aftertouch",
+        CONTROL_CHANGE: "CC",
+        PROGRAM_CHANGE: "Program",
+        CHANNEL_AFTERTOUCH: "Channel Aftertouch",
+        PITCH_BEND: "Pitch Bend",
+        NRPN: "NRPN",
+        RPN: "RPN",
+    }
+
+    def key(type, channel, number):
+        return (type << 24) | (channel << 16) | number
+
+    def omni_key(key):
+        return (key & ~0xFF0000) | (MidiController_Event.OMNI_CHANNEL << 16)
+
+    def split_key(key):
+        return (key >> 24, (key >> 16) & 0xFF, key & 0xFFFF)
+
+    def is_press(event, previous_value):
+        # Buttons: a note on or program change, or a CC/other control going from 0 to above 0.
+        type = event[0]
+        if type == MidiController_Event.PROGRAM_CHANGE:
+            return True
+        if type == MidiController_Event.NOTE_ON:
+            return event[3] > 0
+        return event[3] > 0 and not previous_value
+
+    def describe(key):
+        if key is None:
+            return "None"
+        type, channel, number = MidiController_Event.split_key(int(key))
+        name = MidiController_Event.type_names.get(type, f"Type {type}")
+        channel_name = "Any" if channel == MidiController_Event.OMNI_CHANNEL else f"{channel + 1}"
+        if type in [MidiController_Event.PITCH_BEND, MidiController_Event.CHANNEL_AFTERTOUCH]:
+            return f"{name} (Ch {channel_name})"
+        return f"{name} {number} (Ch {channel_name})"
+
+    def migrate_legacy_control(control):
+        # Controls stored before events were typed: data1 of any message (mostly CC),
+        # or the NRPN/RPN/pitch bend ranges of the first high resolution decoder.
+        control = int(control)
+        omni = MidiController_Event.OMNI_CHANNEL
+        if control >= 0x30000:
+            return MidiController_Event.key(MidiController_Event.PITCH_BEND, omni, 0)
+        if control >= 0x20000:
+            return MidiController_Event.key(MidiController_Event.RPN, omni, control - 0x20000)
+        if control >= 0x10000:
+            return MidiController_Event.key(MidiController_Event.NRPN, omni, control - 0x10000)
+        return MidiController_Event.key(MidiController_Event.CONTROL_CHANGE, omni, control)
+
+    def migrate_legacy_button(control, status):
+        # Buttons were stored as data1 and the status byte they were pressed with.
+        status = int(status)
+        if status < 0x80:
+            return MidiController_Event.migrate_legacy_control(control)
+        return MidiController_Event.key(status >> 4, status & 0x0F, int(control))
+
+
+class MidiController_Decoder():
+    """Turns raw (message, delta, arrival, device index) tuples into MidiController_Event tuples.
+
+    With high_resolution, 14-bit CC pairs, NRPN/RPN data entry and pitch bend get bits = 14,
+    otherwise every value is 7-bit (pitch bend is then reduced to its msb). It is off by
+    default, controllers using CC 32-63 or 6/38/96-101 as ordinary controls would lose them.
+
+    A pair is found by a lsb (CC 32-63) directly following its msb (CC 0-31) on the same
+    channel. From then on every lsb of that pair is merged with the last msb, also when
+    it arrives alone (fine moves that did not change the msb). A lsb of a control not yet
+    seen as a pair is an ordinary control.
+    """
+    CC_DATA_ENTRY_MSB = 6
+    CC_DATA_ENTRY_LSB = 38
+    CC_DATA_INCREMENT = 96
+    CC_DATA_DECREMENT = 97
+    CC_NRPN_LSB = 98
+    CC_NRPN_MSB = 99
+    CC_RPN_LSB = 100
+    CC_RPN_MSB = 101
+
+    def __init__(self, high_resolution=False):
+        self.high_resolution = high_resolution
+        self.reset()
+
+    def reset(self):
+        # {(channel, cc 0-31): msb}
+        self.cc_msb = {}
+        # (channel, cc 0-31) for which a lsb (cc + 32) was seen, those are sent as 14-bit pairs.
+        self.cc_pairs = set()
+        # {channel: number of the last message when it was a CC}, a lsb only pairs with the msb right before it.
+        self.previous_control = {}
+        # {channel: [parameter msb, parameter lsb, event type]}
+        self.parameter = {}
+        # {channel: data entry value (14-bit)}
+        self.data_entry = {}
+
+    def decode(self, messages):
+        decoded = []
+        for message in messages:
+            event = self.decode_message(message)
+            if event is not None:
+                decoded.append(event)
+        return decoded
+
+    def decode_message(self, message):
+        data = message[0]
+        if len(data) < 2 or data[0] < 0x80 or data[0] >= 0xF0:
+            # Running status is resolved by rtmidi, system messages are not routed.
+            return None
+        status = data[0]
+        type = status >> 4
+        channel = status & 0x0F
+        if type != MidiController_Event.CONTROL_CHANGE and self.high_resolution:
+            self.previous_control.pop(channel, None)
+        if type == MidiController_Event.PROGRAM_CHANGE:
+            return (type, channel, data[1], 127, message[2], message[3], 7)
+        if type == MidiController_Event.CHANNEL_AFTERTOUCH:
+            return (type, channel, 0, data[1], message[2], message[3], 7)
+        if len(data) < 3:
+            return None
+        if type == MidiController_Event.NOTE_OFF or (type == MidiController_Event.NOTE_ON and data[2] == 0):
+            return (MidiController_Event.NOTE_ON, channel, data[1], 0, message[2], message[3], 7)
+        if type == MidiController_Event.PITCH_BEND:
+            if self.high_resolution:
+                return (type, channel, 0, (data[2] << 7) | data[1], message[2], message[3], 14)
+            return (type, channel, 0, data[2], message[2], message[3], 7)
+        if type == MidiController_Event.CONTROL_CHANGE and self.high_resolution:
+            result = self.decode_control_change(channel, data[1], data[2])
+            if result is None:
+                return None
+            return (result[0], channel, result[1], result[2], message[2], message[3], result[3])
+        return (type, channel, data[1], data[2], message[2], message[3], 7)
+
+    def decode_control_change(self, channel, control, value):
+        # Returns (type, number, value, bits) or None when the message only changed decoder state.
+        previous = self.previous_control.get(channel)
+        self.previous_control[channel] = control
+        if control in [self.CC_NRPN_MSB, self.CC_RPN_MSB]:
+            type = MidiController_Event.NRPN if control == self.CC_NRPN_MSB else MidiController_Event.RPN
+            parameter = self.parameter.get(channel)
+            if parameter is None or parameter[2] != type:
+                parameter = [0, 0, type]
+                self.parameter[channel] = parameter
+            parameter[0] = value
+            return None
+        if control in [self.CC_NRPN_LSB, self.CC_RPN_LSB]:
+            type = MidiController_Event.NRPN if control == self.CC_NRPN_LSB else MidiController_Event.RPN
+            parameter = self.parameter.get(channel)
+            if parameter is None or parameter[2] != type:
+                parameter = [0, 0, type]
+                self.parameter[channel] = parameter
+            parameter[1] = value
+            # RPN 127/127 is the "null" parameter, data entry goes back to being a normal control.
+            if type == MidiController_Event.RPN and parameter[0] == 127 and value == 127:
+                self.parameter.pop(channel, None)
+            return None
+
+        parameter = self.parameter.get(channel)
+        if parameter is not None and control in [self.CC_DATA_ENTRY_MSB, self.CC_DATA_ENTRY_LSB,
+                                                 self.CC_DATA_INCREMENT, self.CC_DATA_DECREMENT]:
+            data = self.data_entry.get(channel, 0)
+            if control == self.CC_DATA_ENTRY_MSB:
+                data = value << 7
+            elif control == self.CC_DATA_ENTRY_LSB:
+                data = (data & 0x3F80) | value
+            elif control == self.CC_DATA_INCREMENT:
+                data = min(data + 1, 0x3FFF)
+            else:
+                data = max(data - 1, 0)
+            self.data_entry[channel] = data
+            return (parameter[2], (parameter[0] << 7) | parameter[1], data, 14)
+
+        if control < 32:
+            self.cc_msb[(channel, control)] = value
+            if (channel, control) in self.cc_pairs:
+                return (MidiController_Event.CONTROL_CHANGE, control, value << 7, 14)
+            return (MidiController_Event.CONTROL_CHANGE, control, value, 7)
+        if control < 64 and (previous == control - 32 or (channel, control - 32) in self.cc_pairs):
+            msb = self.cc_msb.get((channel, control - 32))
+            if msb is not None:
+                self.cc_pairs.add((channel, control - 32))
+                return (MidiController_Event.CONTROL_CHANGE, control - 32, (msb << 7) | value, 14)
+        return (MidiController_Event.CONTROL_CHANGE, control, value, 7)
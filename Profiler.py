@@ -0,0 +1,107 @@
+"""
+Cost of every update tick and of the subsystems it runs, see MidiController_Midi.update.
+"""
+import cProfile
+import sys
+import time
+import tracemalloc
+from .Latency import *
+
+
+class MidiController_Profiler():
+    """perf_counter spans and net allocated blocks of each subsystem while enabled.
+
+    A capture additionally runs cProfile on the ticks and tracemalloc on everything,
+    stop_capture writes them to a .pstats file and a tracemalloc snapshot next to it.
+    """
+    subsystems = [
+        ("learn", "Learn Scan"),
+        ("replay", "Replay"),
+        ("midi", "Midi Drain"),
+        ("filters", "Filters"),
+        ("tags", "Update Tags"),
+        ("frame", "Frame Update"),
+        ("redraw", "Redraw"),
+        ("tick", "Tick"),
+    ]
+
+    def __init__(self):
+        self.enabled = False
+        self.profile = None
+        # Whether the capture started tracemalloc, so it only stops what it started.
+        self.started_tracemalloc = False
+        self.reset()
+
+    def reset(self):
+        self.times = {name: MidiController_Histogram() for name, label in self.subsystems}
+        self.total_times = {name: 0.0 for name, label in self.subsystems}
+        # sys.getallocatedblocks() after - before, can be negative when a step frees more than it allocates
+        self.allocations = {name: 0 for name, label in self.subsystems}
+        self.max_allocations = {name: 0 for name, label in self.subsystems}
+
+    def record(self, name, seconds, blocks):
+        self.times[name].record(seconds)
+        self.total_times[name] += seconds
+        self.allocations[name] += blocks
+        if blocks > self.max_allocations[name]:
+            self.max_allocations[name] = blocks
+
+    def run(self, instance, steps):
+        # steps: [(subsystem, method name of instance)]
+        perf_counter = time.perf_counter
+        allocated_blocks = sys.getallocatedblocks
+        profile = self.profile
+        if profile is not None:
+            profile.enable()
+        try:
+            tick_start = perf_counter()
+            tick_blocks = allocated_blocks()
+            for name, method in steps:
+                start = perf_counter()
+                blocks = allocated_blocks()
+                getattr(instance, method)()
+                self.record(name, perf_counter() - start, allocated_blocks() - blocks)
+            self.record("tick", perf_counter() - tick_start, allocated_blocks() - tick_blocks)
+        finally:
+            if profile is not None:
+                profile.disable()
+
+    def summary(self, name):
+        # -> (ticks, mean, p95, maximum seconds, mean allocated blocks)
+        histogram = self.times[name]
+        if histogram.count == 0:
+            return (0, 0.0, 0.0, 0.0, 0.0)
+        return (histogram.count,
+                self.total_times[name] / histogram.count,
+                histogram.percentile(0.95),
+                histogram.maximum,
+                self.allocations[name] / histogram.count)
+
+    def is_capturing(self):
+        return self.profile is not None
+
+    def start_capture(self):
+        self.enabled = True
+        self.profile = cProfile.Profile()
+        self.started_tracemalloc = not tracemalloc.is_tracing()
+        if self.started_tracemalloc:
+            tracemalloc.start()
+
+    def stop_capture(self, path):
+        """Writes the captured profile to path and the tracemalloc snapshot to path + ".tracemalloc",
+        load them with pstats.Stats(path) and tracemalloc.Snapshot.load.
+        """
+        profile = self.profile
+        self.profile = None
+        if profile is None:
+            return
+        profile.dump_stats(path)
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            snapshot.dump(path + ".tracemalloc")
+            print("Largest allocations while capturing:")
+            for statistic in snapshot.statistics("lineno")[:10]:
+                print(statistic)
+            if self.started_tracemalloc:
+                tracemalloc.stop()
+        print(f"Profile written to: {path}")
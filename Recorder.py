@@ -0,0 +1,64 @@
+"""
+Records incoming control values during playback, written to F-Curves when recording stops.
+"""
+import array
+
+
+class MidiController_Recorder():
+    """Per control buffers of (frame, raw value), preallocated so recording a message is two array stores.
+    """
+    initial_capacity = 4096
+
+    def __init__(self):
+        self.recording = False
+        # Only true while recording and the animation is playing, updated once per tick.
+        self.active = False
+        self.fps = 24.0
+        self.tick_frame = 0.0
+        self.tick_time = 0.0
+        self.buffers = {}
+
+    def start(self, fps):
+        self.buffers = {}
+        self.fps = fps
+        self.recording = True
+        self.active = False
+
+    def tick(self, is_playing, frame, now):
+        # Anchor the message timestamps of this tick to the current frame, this keeps
+        # subframe accuracy and follows pausing/looping of the playback.
+        self.active = self.recording and is_playing
+        self.tick_frame = frame
+        self.tick_time = now
+
+    def record(self, control, value, timestamp):
+        buffer = self.buffers.get(control)
+        if buffer is None:
+            buffer = [array.array('d', bytes(8 * self.initial_capacity)),
+                      array.array('d', bytes(8 * self.initial_capacity)), 0]
+            self.buffers[control] = buffer
+        count = buffer[2]
+        if count == len(buffer[0]):
+            buffer[0].extend(buffer[0])
+            buffer[1].extend(buffer[1])
+        buffer[0][count] = self.tick_frame + (timestamp - self.tick_time) * self.fps
+        buffer[1][count] = value
+        buffer[2] = count + 1
+
+    def stop(self):
+        """Stop recording, returns {control: (frames, raw values)}.
+        """
+        self.recording = False
+        self.active = False
+        recorded = {}
+        for control, (frames, values, count) in self.buffers.items():
+            if count > 0:
+                recorded[control] = (frames[:count], values[:count])
+        self.buffers = {}
+        return recorded
+
+    def count(self):
+        total = 0
+        for buffer in self.buffers.values():
+            total += buffer[2]
+        return total
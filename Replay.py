@@ -0,0 +1,198 @@
+"""
+Replays a midi journal or a standard midi file through the same path as live input.
+"""
+import struct
+from .Journal import *
+
+
+class MidiController_MidiFile:
+    """Minimal standard midi file reader, only the channel messages and the tempo map are kept.
+    """
+
+    def read_variable_length(data, offset):
+        value = 0
+        while True:
+            byte = data[offset]
+            offset += 1
+            value = (value << 7) | (byte & 0x7F)
+            if byte < 0x80:
+                return (value, offset)
+
+    def read_track(data, offset, end):
+        # -> [(tick, [status, data1(, data2)])], [(tick, microseconds per quarter)]
+        messages = []
+        tempos = []
+        tick = 0
+        running_status = 0
+        while offset < end:
+            delta, offset = MidiController_MidiFile.read_variable_length(data, offset)
+            tick += delta
+            status = data[offset]
+            if status < 0x80:
+                # Running status, the byte already is the first data byte.
+                status = running_status
+            else:
+                offset += 1
+            if status == 0xFF:
+                meta = data[offset]
+                length, offset = MidiController_MidiFile.read_variable_length(data, offset + 1)
+                if meta == 0x51 and length == 3:
+                    tempos.append((tick, (data[offset] << 16) | (data[offset + 1] << 8) | data[offset + 2]))
+                elif meta == 0x2F:
+                    break
+                offset += length
+            elif status == 0xF0 or status == 0xF7:
+                length, offset = MidiController_MidiFile.read_variable_length(data, offset)
+                offset += length
+            else:
+                running_status = status
+                if status & 0xF0 in [0xC0, 0xD0]:
+                    messages.append((tick, [status, data[offset]]))
+                    offset += 1
+                else:
+                    messages.append((tick, [status, data[offset], data[offset + 1]]))
+                    offset += 2
+        return (messages, tempos)
+
+    def read(path):
+        """Returns [(seconds, [status, data1(, data2)])] of all tracks, in time order.
+        """
+        with open(path, "rb") as midi_file:
+            data = midi_file.read()
+        if data[0:4] != b"MThd":
+            raise Exception(f"Not a midi file: {path}")
+        header_length = struct.unpack_from(">I", data, 4)[0]
+        file_format, track_count, division = struct.unpack_from(">HHH", data, 8)
+        offset = 8 + header_length
+
+        messages = []
+        tempos = []
+        for track in range(track_count):
+            if data[offset:offset + 4] != b"MTrk":
+                break
+            length = struct.unpack_from(">I", data, offset + 4)[0]
+            track_messages, track_tempos = MidiController_MidiFile.read_track(
+                data, offset + 8, offset + 8 + length)
+            messages += track_messages
+            tempos += track_tempos
+            offset += 8 + length
+        messages.sort(key=lambda message: message[0])
+
+        if division & 0x8000:
+            # SMPTE: frames per second and ticks per frame, the tempo does not matter.
+            fps = 256 - (division >> 8)
+            seconds_per_tick = 1.0 / (fps * (division & 0xFF))
+            return [(tick * seconds_per_tick, message) for tick, message in messages]
+
+        # Ticks per quarter note, converted with the tempo map (120 bpm until the first tempo).
+        tempos.sort(key=lambda tempo: tempo[0])
+        tempos = [(0, 500000)] + tempos
+        converted = []
+        tempo_index = 0
+        tempo_tick = 0
+        tempo_seconds = 0.0
+        seconds_per_tick = tempos[0][1] / 1000000.0 / division
+        for tick, message in messages:
+            while tempo_index + 1 < len(tempos) and tempos[tempo_index + 1][0] <= tick:
+                tempo_index += 1
+                tempo_seconds += (tempos[tempo_index][0] - tempo_tick) * seconds_per_tick
+                tempo_tick = tempos[tempo_index][0]
+                seconds_per_tick = tempos[tempo_index][1] / 1000000.0 / division
+            converted.append((tempo_seconds + (tick - tempo_tick) * seconds_per_tick, message))
+        return converted
+
+
+class MidiController_Replay():
+    """Pushes recorded messages into the input queue, as if they arrived from a device.
+
+    REALTIME keeps the recorded timing, FAST pushes fast_batch messages per tick and the
+    update timer runs again right away, FRAME pushes one scene frame of recorded time per
+    tick while stepping the scene to that frame.
+    """
+    pacings = [
+        ("REALTIME", "Real-Time", "Replay with the recorded timing"),
+        ("FAST", "As Fast As Possible", "Replay a batch of messages per update, without waiting between updates"),
+        ("FRAME", "Frame Stepped", "Replay one frame of recorded time per update, stepping the scene frame"),
+    ]
+    # Messages per update when replaying FAST, ui and depsgraph still get to run in between.
+    fast_batch = 512
+
+    def __init__(self):
+        self.active = False
+        self.entries = []
+        self.position = 0
+        self.pacing = "REALTIME"
+        # {source device of the entries: index of the device it replays into}, the
+        # others replay into default_index.
+        self.device_indices = {}
+        self.default_index = 0
+        # Names of the devices opened for the replay, closed again when it finishes.
+        self.opened_devices = []
+        self.start_time = 0.0
+        self.source_time = 0.0
+
+    def load(path):
+        """Returns the device names and [(seconds, [status, data1, data2], source device)] of a
+        midi file or a journal. The source device is the position in the device names, midi
+        files and version 1 journals have no names.
+        """
+        if path.lower().endswith((".mid", ".midi", ".smf")):
+            return ([], [(seconds, message, 0) for seconds, message in MidiController_MidiFile.read(path)])
+        device_names, entries = MidiController_Journal.read(path)
+        if len(entries) == 0:
+            return (device_names, [])
+        first = entries[0][0]
+        return (device_names, [(entry[0] - first, [entry[2], entry[3], entry[4]], entry[1]) for entry in entries])
+
+    def start(self, entries, device_indices, default_index, pacing, now):
+        self.entries = entries
+        self.position = 0
+        self.device_indices = device_indices
+        self.default_index = default_index
+        self.pacing = pacing
+        self.start_time = now
+        self.source_time = 0.0
+        self.active = len(entries) > 0
+
+    def stop(self):
+        self.active = False
+        self.entries = []
+        self.position = 0
+
+    def push_until(self, queue, source_time):
+        # Arrival times are the recorded times from the start, keeps the recorded ordering.
+        entries = self.entries
+        position = self.position
+        count = len(entries)
+        device_indices = self.device_indices
+        default_index = self.default_index
+        while position < count and entries[position][0] <= source_time:
+            entry = entries[position]
+            queue.append((entry[1], 0.0, self.start_time + entry[0],
+                          device_indices.get(entry[2], default_index)))
+            position += 1
+        self.position = position
+        self.source_time = source_time
+        if position >= count:
+            self.active = False
+
+    def pump(self, queue, now):
+        # REALTIME: everything recorded up to now.
+        self.push_until(queue, now - self.start_time)
+
+    def step(self, queue, seconds):
+        # FRAME: the next seconds of recorded time.
+        self.push_until(queue, self.source_time + seconds)
+
+    def step_batch(self, queue, count):
+        # FAST: the next count messages, with the recorded timestamps.
+        last = min(self.position + count, len(self.entries)) - 1
+        if last < self.position:
+            self.active = False
+            return
+        self.push_until(queue, self.entries[last][0])
+
+    def next_time(self):
+        if self.position >= len(self.entries):
+            return None
+        return self.entries[self.position][0]
@@ -0,0 +1,251 @@
+"""
+Settings of the midi devices, stored in the blend file as property groups on the scene.
+"""
+import bpy
+
+
+class MIDICONTROLLER_FilterStorage(bpy.types.PropertyGroup):
+    mode: bpy.props.StringProperty(default="NONE")
+    time_constant: bpy.props.FloatProperty(default=0.05)
+    min_cutoff: bpy.props.FloatProperty(default=1.0)
+    beta: bpy.props.FloatProperty(default=0)
+    deadband: bpy.props.FloatProperty(default=0)
+    epsilon: bpy.props.FloatProperty(default=0)
+
+
+class MIDICONTROLLER_CurvePointStorage(bpy.types.PropertyGroup):
+    location: bpy.props.FloatVectorProperty(size=2)
+
+
+class MIDICONTROLLER_MappingStorage(bpy.types.PropertyGroup):
+    # name (the mapped property slot) is the builtin PropertyGroup name.
+    control: bpy.props.IntProperty(default=0)
+    # Position in the list of mappings of the control.
+    position: bpy.props.IntProperty(default=0)
+    property: bpy.props.StringProperty(default="")
+    # -1 when the property is not an array.
+    index: bpy.props.IntProperty(default=-1)
+    key: bpy.props.BoolProperty(default=False)
+    data: bpy.props.BoolProperty(default=False)
+    type: bpy.props.StringProperty(default="")
+    min: bpy.props.FloatProperty(default=0)
+    max: bpy.props.FloatProperty(default=0)
+    resolution: bpy.props.IntProperty(default=7)
+    target_collection: bpy.props.StringProperty(default="")
+    # Name of a selection group of the device, wins over target_collection.
+    target_group: bpy.props.StringProperty(default="")
+    simplify_tolerance: bpy.props.FloatProperty(default=0)
+    curve: bpy.props.StringProperty(default="LINEAR")
+    curve_amount: bpy.props.FloatProperty(default=4.0)
+    curve_steps: bpy.props.IntProperty(default=4)
+    curve_invert: bpy.props.BoolProperty(default=False)
+    curve_points: bpy.props.CollectionProperty(type=MIDICONTROLLER_CurvePointStorage)
+    has_filter: bpy.props.BoolProperty(default=False)
+    filter: bpy.props.PointerProperty(type=MIDICONTROLLER_FilterStorage)
+
+
+class MIDICONTROLLER_ControllerNameStorage(bpy.types.PropertyGroup):
+    control: bpy.props.IntProperty(default=0)
+
+
+class MIDICONTROLLER_ObjectNameStorage(bpy.types.PropertyGroup):
+    pass
+
+
+class MIDICONTROLLER_SelectionGroupStorage(bpy.types.PropertyGroup):
+    control: bpy.props.IntProperty(default=0)
+    selected_objects: bpy.props.CollectionProperty(type=MIDICONTROLLER_ObjectNameStorage)
+
+
+class MIDICONTROLLER_DeviceStorage(bpy.types.PropertyGroup):
+    # name is the midi port name.
+    version: bpy.props.IntProperty(default=2)
+    # 14-bit CC pairs, NRPN/RPN and pitch bend, see MidiController_Decoder.
+    high_resolution: bpy.props.BoolProperty(default=False)
+    controller_names: bpy.props.CollectionProperty(type=MIDICONTROLLER_ControllerNameStorage)
+    mappings: bpy.props.CollectionProperty(type=MIDICONTROLLER_MappingStorage)
+    active_mapping_index: bpy.props.IntProperty(default=0)
+    selection_groups: bpy.props.CollectionProperty(type=MIDICONTROLLER_SelectionGroupStorage)
+    # Routing keys, -1 when not bound.
+    key_frame_control: bpy.props.IntProperty(default=-1)
+    frame_increase_control: bpy.props.IntProperty(default=-1)
+    frame_decrease_control: bpy.props.IntProperty(default=-1)
+    frame_control_resolution: bpy.props.IntProperty(default=5)
+    frame_control_timeout: bpy.props.IntProperty(default=1)
+
+
+class MIDICONTROLLER_Storage(bpy.types.PropertyGroup):
+    devices: bpy.props.CollectionProperty(type=MIDICONTROLLER_DeviceStorage)
+
+
+# In registration order, nested groups first.
+storage_classes = (
+    MIDICONTROLLER_FilterStorage,
+    MIDICONTROLLER_CurvePointStorage,
+    MIDICONTROLLER_MappingStorage,
+    MIDICONTROLLER_ControllerNameStorage,
+    MIDICONTROLLER_ObjectNameStorage,
+    MIDICONTROLLER_SelectionGroupStorage,
+    MIDICONTROLLER_DeviceStorage,
+    MIDICONTROLLER_Storage,
+)
+
+
+class MidiController_Storage:
+    """Converts between the property groups and the sections MidiController_Device saves and loads.
+    """
+    mapping_fields = ["property", "key", "data", "type", "min", "max", "resolution", "target_collection",
+                      "target_group", "simplify_tolerance", "curve", "curve_amount", "curve_steps", "curve_invert"]
+    filter_fields = ["mode", "time_constant", "min_cutoff", "beta", "deadband", "epsilon"]
+
+    def get():
+        # Stored on the scene that has settings, the current scene for a new file.
+        scene = bpy.context.scene
+        if len(scene.midi_control_storage.devices) == 0:
+            for other in bpy.data.scenes:
+                if len(other.midi_control_storage.devices) > 0:
+                    return other.midi_control_storage
+        return scene.midi_control_storage
+
+    def find_device(storage, name):
+        return storage.devices.get(name)
+
+    def write_device(storage, name, section):
+        # Every part is written on its own, a bad field (of an imported or legacy section)
+        # only loses that part.
+        device = storage.devices.get(name)
+        if device is None:
+            device = storage.devices.add()
+            device.name = name
+        device.version = section.get("version", 2)
+        device.high_resolution = bool(section.get("high_resolution", False))
+
+        device.controller_names.clear()
+        try:
+            for control, controller_name in section["controller_names"].items():
+                item = device.controller_names.add()
+                item.control = int(control)
+                item.name = controller_name
+        except Exception as e:
+            print(f"Failed writing: controller_names")
+            print(e)
+
+        device.mappings.clear()
+        try:
+            for control, mapping_array in section["controller_mapping"].items():
+                for position, mapping in enumerate(mapping_array):
+                    item = device.mappings.add()
+                    item.control = int(control)
+                    item.position = position
+                    MidiController_Storage.write_mapping(item, mapping)
+        except Exception as e:
+            print(f"Failed writing: controller_mapping")
+            print(e)
+        if device.active_mapping_index >= len(device.mappings):
+            device.active_mapping_index = 0
+
+        device.selection_groups.clear()
+        try:
+            for control, group in section["selection_groups"]["mapping"].items():
+                item = device.selection_groups.add()
+                item.control = int(control)
+                item.name = group["name"]
+                # Groups mapped with an empty selection were stored as None.
+                for object_name in group["selected_objects"] or []:
+                    item.selected_objects.add().name = object_name
+        except Exception as e:
+            print(f"Failed writing: selection_groups")
+            print(e)
+
+        try:
+            key_frame_control = section["controller_keyframe_bind"]["mapping"]
+            device.key_frame_control = -1 if key_frame_control is None else int(key_frame_control)
+        except Exception as e:
+            print(f"Failed writing: controller_keyframe_bind")
+            print(e)
+
+        try:
+            frame_control = section["frame_control"]
+            increase = frame_control["increase"]["controller"]
+            decrease = frame_control["decrease"]["controller"]
+            device.frame_increase_control = -1 if increase is None else int(increase)
+            device.frame_decrease_control = -1 if decrease is None else int(decrease)
+            device.frame_control_resolution = int(frame_control["frame_control_resolution"])
+            device.frame_control_timeout = int(frame_control["timeout"])
+        except Exception as e:
+            print(f"Failed writing: frame_control")
+            print(e)
+
+    def write_mapping(item, mapping):
+        item.name = mapping["name"]
+        item.index = -1 if mapping["index"] is None else mapping["index"]
+        for field in MidiController_Storage.mapping_fields:
+            if field in mapping:
+                setattr(item, field, mapping[field])
+        item.curve_points.clear()
+        for point in mapping.get("curve_points", []):
+            item.curve_points.add().location = point
+        item.has_filter = "filter" in mapping
+        if item.has_filter:
+            for field in MidiController_Storage.filter_fields:
+                if field in mapping["filter"]:
+                    setattr(item.filter, field, mapping["filter"][field])
+
+    def read_device(device):
+        """Returns the section of a stored device, as MidiController_Device.to_save makes it.
+        """
+        controller_mapping = {}
+        for item in device.mappings:
+            controller_mapping.setdefault(str(item.control), []).append(
+                (item.position, MidiController_Storage.read_mapping(item)))
+        for control, mapping_array in controller_mapping.items():
+            mapping_array.sort(key=lambda pair: pair[0])
+            controller_mapping[control] = [mapping for position, mapping in mapping_array]
+
+        selection_mapping = {}
+        for item in device.selection_groups:
+            selection_mapping[str(item.control)] = {
+                "name": item.name,
+                "selected_objects": [object_name.name for object_name in item.selected_objects]
+            }
+
+        def controller(value):
+            return None if value < 0 else value
+
+        return {
+            "version": device.version,
+            "high_resolution": device.high_resolution,
+            "controller_names": {str(item.control): item.name for item in device.controller_names},
+            "controller_mapping": controller_mapping,
+            "selection_groups": {
+                "mapping": selection_mapping
+            },
+            "controller_keyframe_bind": {
+                "mapping": controller(device.key_frame_control)
+            },
+            "frame_control": {
+                # The binding state is not stored, MidiController_Device.load_section restores it.
+                "increase": {
+                    "controller": controller(device.frame_increase_control)
+                },
+                "decrease": {
+                    "controller": controller(device.frame_decrease_control)
+                },
+                "frame_control_resolution": device.frame_control_resolution,
+                "timeout": device.frame_control_timeout,
+            }
+        }
+
+    def read_mapping(item):
+        mapping = {
+            "name": item.name,
+            "index": None if item.index < 0 else item.index,
+        }
+        for field in MidiController_Storage.mapping_fields:
+            mapping[field] = getattr(item, field)
+        if len(item.curve_points) > 0:
+            mapping["curve_points"] = [list(point.location) for point in item.curve_points]
+        if item.has_filter:
+            mapping["filter"] = {field: getattr(item.filter, field)
+                                 for field in MidiController_Storage.filter_fields}
+        return mapping
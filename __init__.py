@@ -17,6 +17,7 @@ import bpy
 import site
 import os
 import subprocess
+import tempfile
 from bpy.app.handlers import persistent
 
 from .Dependencies import *
@@ -53,17 +54,41 @@ global midicontrol_instance
 midicontrol_instance = MidiController_Midi()
 
 
+def update_redraw_rate(self, context):
+    context.scene.MidiControl.ui_redraw_interval = 1.0 / self.ui_redraw_rate
+
+
 class MIDICONTROLLER_GenericProperties(bpy.types.PropertyGroup):
     bl_label = "generic_properties"
     new_prop_min: bpy.props.IntProperty(name="new_prop_min", default=0)
     new_prop_max: bpy.props.IntProperty(name="new_prop_max", default=1)
     edit_prop_min: bpy.props.IntProperty(name="edit_prop_min", default=0)
     edit_prop_max: bpy.props.IntProperty(name="edit_prop_max", default=1)
+    edit_simplify_tolerance: bpy.props.FloatProperty(name="edit_simplify_tolerance", default=0, min=0)
+    new_target_collection: bpy.props.StringProperty(name="new_target_collection", default="")
+    edit_target_collection: bpy.props.StringProperty(name="edit_target_collection", default="")
+    new_target_group: bpy.props.StringProperty(name="new_target_group", default="")
+    edit_target_group: bpy.props.StringProperty(name="edit_target_group", default="")
+    edit_curve_type: bpy.props.EnumProperty(name="edit_curve_type", items=MidiController_Curves.types, default="LINEAR")
+    edit_curve_amount: bpy.props.FloatProperty(name="edit_curve_amount", default=4.0, min=0.01)
+    edit_curve_steps: bpy.props.IntProperty(name="edit_curve_steps", default=4, min=2)
+    edit_curve_invert: bpy.props.BoolProperty(name="edit_curve_invert", default=False)
+    edit_filter_mode: bpy.props.EnumProperty(name="edit_filter_mode", items=MidiController_Filter.modes, default="NONE")
+    edit_filter_time_constant: bpy.props.FloatProperty(name="edit_filter_time_constant", default=0.05, min=0.0001)
+    edit_filter_min_cutoff: bpy.props.FloatProperty(name="edit_filter_min_cutoff", default=1.0, min=0.0001)
+    edit_filter_beta: bpy.props.FloatProperty(name="edit_filter_beta", default=0, min=0)
+    edit_filter_deadband: bpy.props.FloatProperty(name="edit_filter_deadband", default=0, min=0)
+    edit_filter_epsilon: bpy.props.FloatProperty(name="edit_filter_epsilon", default=0, min=0)
     frame_control_sensitivity: bpy.props.IntProperty(name="frame_control_sensitivity", default=1)
     frame_control_update_timeout: bpy.props.IntProperty(name="frame_control_update_timeout", default=1)
     new_controller_name: bpy.props.StringProperty(name="new_controller_name", default="")
     edit_controller_name: bpy.props.StringProperty(name="edit_controller_name", default="")
     selection_group_name: bpy.props.StringProperty(name="selection_group_name", default="")
+    journal_path: bpy.props.StringProperty(name="journal_path", default="", subtype="FILE_PATH")
+    profile_path: bpy.props.StringProperty(name="profile_path", default="", subtype="FILE_PATH")
+    # Redraws per second of the sidebars and 3D views while controls are moving.
+    ui_redraw_rate: bpy.props.IntProperty(name="ui_redraw_rate", default=10, min=1, max=120,
+                                          update=update_redraw_rate)
 
 
 
@@ -105,30 +130,60 @@ class MIDICONTROLLER_OP_ConnectMidi(bpy.types.Operator):
         scene = context.scene
         midi_control = scene.MidiControl
 
-        scene = context.scene
-        midi_control = scene.MidiControl
-        midi_control.connected_port = self.midi_port
-        midi_control.connected_controller = midi_control.available_ports[
-            self.midi_port]
-        midi_control.midi_input.open_port(self.midi_port)
-        midi_control.midi_open = midi_control.midi_input.is_port_open()
-
-        midi_control.load()
-        midi_control.save()
+        name = midi_control.available_ports[self.midi_port]
+        if name in midi_control.devices:
+            return {"CANCELLED"}
+        # Every device gets its own input, they all feed the same message queue.
+        midi_input = rtmidi.MidiIn()
+        midi_input.open_port(self.midi_port)
+        if not midi_input.is_port_open():
+            midi_input.delete()
+            return {"CANCELLED"}
+        device = midi_control.open_device(name, self.midi_port, midi_input)
+        midi_control.ui_redraw_interval = 1.0 / scene.generic_properties.ui_redraw_rate
+
+        # Only the new device, the open ones keep their (possibly unsaved) settings.
+        midi_control.load(device=device)
+        midi_control.save(device=device)
+
+        # The update timer unregisters itself while no device is connected.
+        if not bpy.app.timers.is_registered(updatetimer):
+            bpy.app.timers.register(updatetimer)
         return {"FINISHED"}
 
 
 class MIDICONTROLLER_OP_DisconnectMidi(bpy.types.Operator):
     bl_idname = "wm.disconnect_midi"
     bl_label = "Disconnect Midi Controller"
-    bl_description = "Disconnect the currently connected midi controller."
+    bl_description = "Disconnect a connected midi controller, all of them when no name is given."
+
+    device_name: bpy.props.StringProperty(default="")
 
     def execute(self, context):
         scene = context.scene
         midi_control = scene.MidiControl
-        midi_control.save()
+        midi_control.flush_save()
         if midi_control.midi_open:
-            midi_control.close()
+            if self.device_name == "":
+                midi_control.close()
+            else:
+                midi_control.close_device(self.device_name)
+        return {"FINISHED"}
+
+
+class MIDICONTROLLER_OP_SelectMidiDevice(bpy.types.Operator):
+    bl_idname = "wm.select_midi_device"
+    bl_label = "Configure Midi Controller"
+    bl_description = "Configure this midi controller, binding and learning listen to the configured controller only."
+
+    device_name: bpy.props.StringProperty(default="")
+
+    def execute(self, context):
+        scene = context.scene
+        midi_control = scene.MidiControl
+        if self.device_name not in midi_control.devices:
+            return {"CANCELLED"}
+        midi_control.set_active_device(self.device_name)
         return {"FINISHED"}
 
 
@@ -140,6 +195,8 @@ class MIDICONTROLLER_OP_SavePropertyMapping(bpy.types.Operator):
     min: bpy.props.FloatProperty(default=0)
     max: bpy.props.FloatProperty(default=0)
     controller_name: bpy.props.StringProperty(default="")
+    target_collection: bpy.props.StringProperty(default="")
+    target_group: bpy.props.StringProperty(default="")
     cancel: bpy.props.BoolProperty(default=False)
     refresh: bpy.props.BoolProperty(default=False)
 
@@ -159,12 +216,17 @@ class MIDICONTROLLER_OP_SavePropertyMapping(bpy.types.Operator):
             update_scene_prop('generic_properties', 'new_prop_min', int(0), scene.name)
             update_scene_prop('generic_properties', 'new_prop_max', int(1), scene.name)
             update_scene_prop('generic_properties', 'new_controller_name', "", scene.name)
+            update_scene_prop('generic_properties', 'new_target_collection', "", scene.name)
+            update_scene_prop('generic_properties', 'new_target_group', "", scene.name)
             return {"FINISHED"}
 
         if midi_control.current_mapping_state == midi_control.State.CONFIGURE_MAPPING:
 
             midi_control.mapping_pending["min"] = self.min
             midi_control.mapping_pending["max"] = self.max
+            midi_control.mapping_pending["target_collection"] = self.target_collection
+            midi_control.mapping_pending["target_group"] = self.target_group
+            midi_control.mapping_pending["resolution"] = midi_control.midi_control_to_map_bits
             if str(midi_control.midi_control_to_map) not in midi_control.controller_property_mapping:
                 midi_control.controller_property_mapping[str(midi_control.midi_control_to_map)] = [
                     copy.copy(midi_control.mapping_pending)]
@@ -176,14 +238,19 @@ class MIDICONTROLLER_OP_SavePropertyMapping(bpy.types.Operator):
                 midi_control.controller_names[str(
                     midi_control.midi_control_to_map)] = self.controller_name
 
+            midi_control.compile_mappings()
             midi_control.mapping_pending = None
             midi_control.midi_control_to_map = None
             midi_control.current_mapping_state = midi_control.State.REGISTER_CONTROL
             update_scene_prop('generic_properties', 'new_prop_min', int(0), scene.name)
             update_scene_prop('generic_properties', 'new_prop_max', int(1), scene.name)
             update_scene_prop('generic_properties', 'new_controller_name', "", scene.name)
+            update_scene_prop('generic_properties', 'new_target_collection', "", scene.name)
+            update_scene_prop('generic_properties', 'new_target_group', "", scene.name)
 
         midi_control.save()
+        # The mapped controls list draws from the storage, write it right away.
+        midi_control.flush_save()
         return {"FINISHED"}
 
 
@@ -198,6 +265,19 @@ class MIDICONTROLLER_OP_UpdatePropertyMapping(bpy.types.Operator):
     min: bpy.props.FloatProperty(default=0)
     max: bpy.props.FloatProperty(default=0)
     controller_name: bpy.props.StringProperty(default="")
+    simplify_tolerance: bpy.props.FloatProperty(default=0)
+    target_collection: bpy.props.StringProperty(default="")
+    target_group: bpy.props.StringProperty(default="")
+    curve_type: bpy.props.StringProperty(default="LINEAR")
+    curve_amount: bpy.props.FloatProperty(default=4.0)
+    curve_steps: bpy.props.IntProperty(default=4)
+    curve_invert: bpy.props.BoolProperty(default=False)
+    filter_mode: bpy.props.StringProperty(default="NONE")
+    filter_time_constant: bpy.props.FloatProperty(default=0.05)
+    filter_min_cutoff: bpy.props.FloatProperty(default=1.0)
+    filter_beta: bpy.props.FloatProperty(default=0)
+    filter_deadband: bpy.props.FloatProperty(default=0)
+    filter_epsilon: bpy.props.FloatProperty(default=0)
     edit: bpy.props.BoolProperty(default=False)
     save: bpy.props.BoolProperty(default=False)
     delete: bpy.props.BoolProperty(default=False)
@@ -216,14 +296,57 @@ class MIDICONTROLLER_OP_UpdatePropertyMapping(bpy.types.Operator):
             update_scene_prop('generic_properties', 'edit_prop_min', int(min), scene.name)
             max = midi_control.controller_property_mapping[self.midi_control][self.index]['max']
             update_scene_prop('generic_properties', 'edit_prop_max', int(max), scene.name)
+            tolerance = midi_control.controller_property_mapping[self.midi_control][self.index].get('simplify_tolerance', 0)
+            update_scene_prop('generic_properties', 'edit_simplify_tolerance', float(tolerance), scene.name)
+            target = midi_control.controller_property_mapping[self.midi_control][self.index].get('target_collection', "")
+            update_scene_prop('generic_properties', 'edit_target_collection', target, scene.name)
+            target = midi_control.controller_property_mapping[self.midi_control][self.index].get('target_group', "")
+            update_scene_prop('generic_properties', 'edit_target_group', target, scene.name)
+            mapping = midi_control.controller_property_mapping[self.midi_control][self.index]
+            # Enums are stored as int id properties, set the curve type through rna.
+            scene.generic_properties.edit_curve_type = mapping.get('curve', "LINEAR")
+            update_scene_prop('generic_properties', 'edit_curve_amount', float(mapping.get('curve_amount', 4.0)), scene.name)
+            update_scene_prop('generic_properties', 'edit_curve_steps', int(mapping.get('curve_steps', 4)), scene.name)
+            update_scene_prop('generic_properties', 'edit_curve_invert', bool(mapping.get('curve_invert', False)), scene.name)
+            MidiController_Curves.load_points(mapping.get('curve_points', []))
+            value_filter = dict(MidiController_Filter.default_settings)
+            value_filter.update(midi_control.controller_property_mapping[self.midi_control][self.index].get('filter', {}))
+            # Enums are stored as int id properties, set the mode through rna.
+            scene.generic_properties.edit_filter_mode = value_filter.pop("mode")
+            for setting, value in value_filter.items():
+                update_scene_prop('generic_properties', f'edit_filter_{setting}', float(value), scene.name)
 
         if self.save:
             midi_control.controller_property_mapping[midi_control.editting_controller][
                 midi_control.editting_index]['min'] = self.min
             midi_control.controller_property_mapping[midi_control.editting_controller][
                 midi_control.editting_index]['max'] = self.max
+            midi_control.controller_property_mapping[midi_control.editting_controller][
+                midi_control.editting_index]['simplify_tolerance'] = self.simplify_tolerance
+            midi_control.controller_property_mapping[midi_control.editting_controller][
+                midi_control.editting_index]['target_collection'] = self.target_collection
+            midi_control.controller_property_mapping[midi_control.editting_controller][
+                midi_control.editting_index]['target_group'] = self.target_group
+            mapping = midi_control.controller_property_mapping[midi_control.editting_controller][
+                midi_control.editting_index]
+            mapping['curve'] = self.curve_type
+            mapping['curve_amount'] = self.curve_amount
+            mapping['curve_steps'] = self.curve_steps
+            mapping['curve_invert'] = self.curve_invert
+            if self.curve_type == "CUSTOM":
+                mapping['curve_points'] = MidiController_Curves.read_points()
+            midi_control.controller_property_mapping[midi_control.editting_controller][
+                midi_control.editting_index]['filter'] = {
+                    "mode": self.filter_mode,
+                    "time_constant": self.filter_time_constant,
+                    "min_cutoff": self.filter_min_cutoff,
+                    "beta": self.filter_beta,
+                    "deadband": self.filter_deadband,
+                    "epsilon": self.filter_epsilon
+            }
             midi_control.controller_names[str(
                 midi_control.editting_controller)] = self.controller_name
+            midi_control.compile_mappings()
             midi_control.editting_controller = None
             midi_control.editting_mapped = None
             midi_control.editting_index = None
@@ -236,6 +359,7 @@ class MIDICONTROLLER_OP_UpdatePropertyMapping(bpy.types.Operator):
             else:
                 midi_control.controller_property_mapping.pop(
                     midi_control.editting_controller, None)
+            midi_control.compile_mappings()
             midi_control.editting_controller = None
             midi_control.editting_mapped = None
             midi_control.editting_index = None
@@ -248,6 +372,7 @@ class MIDICONTROLLER_OP_UpdatePropertyMapping(bpy.types.Operator):
             midi_control.edit_state = midi_control.EditState.NONE
 
         midi_control.save()
+        midi_control.flush_save()
         return {"FINISHED"}
 
 
@@ -272,6 +397,203 @@ class MIDICONTROLLER_OP_UpdateKeyFrameMapping(bpy.types.Operator):
         return {"FINISHED"}
 
 
+class MIDICONTROLLER_OP_RecordPerformance(bpy.types.Operator):
+    bl_idname = "wm.record_performance"
+    bl_label = "Record Performance"
+    bl_description = "Record all mapped controls during playback and write them as keyframes for the selected objects when stopped."
+
+    start: bpy.props.BoolProperty(default=False)
+    stop: bpy.props.BoolProperty(default=False)
+
+    def execute(self, context):
+        scene = context.scene
+        midi_control = scene.MidiControl
+
+        if self.start and not midi_control.recorder.recording:
+            midi_control.start_recording()
+            if not context.screen.is_animation_playing:
+                bpy.ops.screen.animation_play()
+        elif self.stop and midi_control.recorder.recording:
+            if context.screen.is_animation_playing:
+                bpy.ops.screen.animation_cancel(restore_frame=False)
+            fcurves = midi_control.stop_recording()
+            self.report({'INFO'}, f"Recorded {len(fcurves)} F-Curves")
+        return {"FINISHED"}
+
+
+class MIDICONTROLLER_OP_MidiJournal(bpy.types.Operator):
+    bl_idname = "wm.midi_journal"
+    bl_label = "Midi Journal"
+    bl_description = "Write every received midi message to a memory-mapped ring file, to inspect what arrived and when."
+
+    start: bpy.props.BoolProperty(default=False)
+    stop: bpy.props.BoolProperty(default=False)
+
+    def execute(self, context):
+        scene = context.scene
+        midi_control = scene.MidiControl
+
+        if self.start and not midi_control.journal.is_open():
+            path = bpy.path.abspath(scene.generic_properties.journal_path)
+            if path == "":
+                path = os.path.join(tempfile.gettempdir(), "midicontrol.journal")
+            midi_control.start_journal(path)
+            if midi_control.journal.is_open():
+                self.report({'INFO'}, f"Journal: {path}")
+            else:
+                self.report({'ERROR'}, f"Could not open a journal at: {path}, choose a new or journal file")
+                return {"CANCELLED"}
+        elif self.stop and midi_control.journal.is_open():
+            midi_control.stop_journal()
+        return {"FINISHED"}
+
+
+class MIDICONTROLLER_OP_MidiLatency(bpy.types.Operator):
+    bl_idname = "wm.midi_latency"
+    bl_label = "Midi Latency"
+    bl_description = "Measure how long received midi takes to reach the properties, per stage of the update."
+
+    start: bpy.props.BoolProperty(default=False)
+    stop: bpy.props.BoolProperty(default=False)
+    reset: bpy.props.BoolProperty(default=False)
+
+    def execute(self, context):
+        latency = context.scene.MidiControl.latency
+        if self.start:
+            latency.enabled = True
+        elif self.stop:
+            latency.enabled = False
+        if self.reset:
+            latency.reset()
+        return {"FINISHED"}
+
+
+class MIDICONTROLLER_OP_MidiHighResolution(bpy.types.Operator):
+    bl_idname = "wm.midi_high_resolution"
+    bl_label = "High Resolution"
+    bl_description = "Merge 14-bit CC pairs (0-31 with 32-63), NRPN/RPN and pitch bend of the configured controller into 14-bit values. Leave off when the controller uses CC 32-63 or 6/38/96-101 as ordinary controls."
+
+    enable: bpy.props.BoolProperty(default=False)
+
+    def execute(self, context):
+        midi_control = context.scene.MidiControl
+        device = midi_control.active_device
+        if device.name not in midi_control.devices:
+            return {"CANCELLED"}
+        device.set_high_resolution(self.enable)
+        midi_control.save(device=device)
+        return {"FINISHED"}
+
+
+class MIDICONTROLLER_OP_ExportLatency(bpy.types.Operator):
+    bl_idname = "wm.export_midi_latency"
+    bl_label = "Export Latency"
+    bl_description = "Save the latency percentiles and histograms of every stage to a csv file."
+
+    filename: bpy.props.StringProperty(subtype="FILE_NAME")
+    filepath: bpy.props.StringProperty(subtype="FILE_PATH")
+
+    def execute(self, context):
+        midi_control = context.scene.MidiControl
+        with open(self.filepath, "w") as outfile:
+            outfile.write(midi_control.latency.to_csv())
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        self.filename = "midicontrol_latency.csv"
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+
+class MIDICONTROLLER_OP_MidiProfiler(bpy.types.Operator):
+    bl_idname = "wm.midi_profiler"
+    bl_label = "Midi Profiler"
+    bl_description = "Measure the time and allocations of every update and of the parts it runs."
+
+    start: bpy.props.BoolProperty(default=False)
+    stop: bpy.props.BoolProperty(default=False)
+    reset: bpy.props.BoolProperty(default=False)
+
+    def execute(self, context):
+        profiler = context.scene.MidiControl.profiler
+        if self.start:
+            profiler.enabled = True
+        elif self.stop and not profiler.is_capturing():
+            profiler.enabled = False
+        if self.reset:
+            profiler.reset()
+        return {"FINISHED"}
+
+
+class MIDICONTROLLER_OP_MidiProfileCapture(bpy.types.Operator):
+    bl_idname = "wm.midi_profile_capture"
+    bl_label = "Midi Profile Capture"
+    bl_description = "Run cProfile on the updates and tracemalloc until stopped, then write a .pstats file."
+
+    start: bpy.props.BoolProperty(default=False)
+    stop: bpy.props.BoolProperty(default=False)
+
+    def execute(self, context):
+        scene = context.scene
+        profiler = scene.MidiControl.profiler
+
+        if self.start and not profiler.is_capturing():
+            profiler.start_capture()
+        elif self.stop and profiler.is_capturing():
+            path = bpy.path.abspath(scene.generic_properties.profile_path)
+            if path == "":
+                path = os.path.join(tempfile.gettempdir(), "midicontrol.pstats")
+            try:
+                profiler.stop_capture(path)
+                self.report({'INFO'}, f"Profile: {path}")
+            except Exception as e:
+                self.report({'ERROR'}, f"Failed writing: {path}")
+                print(e)
+                return {"CANCELLED"}
+        return {"FINISHED"}
+
+
+class MIDICONTROLLER_OP_ReplayMidi(bpy.types.Operator):
+    bl_idname = "wm.replay_midi"
+    bl_label = "Replay Midi"
+    bl_description = "Replay a midi journal or midi file through the mappings, no midi device needed."
+
+    filepath: bpy.props.StringProperty(subtype="FILE_PATH")
+    pacing: bpy.props.EnumProperty(items=MidiController_Replay.pacings, default="REALTIME")
+    # The device whose settings are used for midi files and journals without device names,
+    # connected or not. Defaults to the configured device.
+    device_name: bpy.props.StringProperty(default="")
+    stop: bpy.props.BoolProperty(default=False)
+
+    def execute(self, context):
+        scene = context.scene
+        midi_control = scene.MidiControl
+
+        if self.stop:
+            midi_control.stop_replay()
+            return {"FINISHED"}
+
+        try:
+            count = midi_control.start_replay(
+                bpy.path.abspath(self.filepath), self.pacing, self.device_name)
+        except Exception as e:
+            self.report({'ERROR'}, f"Failed reading: {self.filepath}")
+            print(e)
+            return {"CANCELLED"}
+
+        if bpy.app.background:
+            # No event loop to run timers in, replay right away.
+            midi_control.run_replay()
+        elif not bpy.app.timers.is_registered(updatetimer):
+            bpy.app.timers.register(updatetimer)
+        self.report({'INFO'}, f"Replaying {count} messages")
+        return {"FINISHED"}
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+
 class MIDICONTROLLER_OP_MapSelectionGroup(bpy.types.Operator):
     bl_idname = "wm.map_selection_group"
     bl_label = "Map Selection Group"
@@ -286,14 +608,11 @@ class MIDICONTROLLER_OP_MapSelectionGroup(bpy.types.Operator):
         midi_control = scene.MidiControl
 
         if self.start:
-            array = None
-            for obj in bpy.context.selected_objects:
-                if array is None:
-                    array = [obj.name]
-                else:
-                    array += [obj.name]
+            selected_objects = bpy.context.selected_objects
             to_map = {
-                "selected": array,
+                "selected": [obj.name for obj in selected_objects],
+                # Only valid this session, lets renamed objects stay in the group.
+                "session_uids": [obj.session_uid for obj in selected_objects],
                 "name": self.name
             }
             midi_control.selection_to_map = copy.copy(to_map)
@@ -323,6 +642,7 @@ class MIDICONTROLLER_OP_DeleteSelectionGroup(bpy.types.Operator):
         try:
             midi_control.controller_selection_mapping.pop(
                 self.controller, None)
+            midi_control.invalidate_targets()
         except Exception as e:
             print(f"Guess we leakin now...")
             print(e)
@@ -396,7 +716,6 @@ class MIDICONTROLLER_OP_Save(bpy.types.Operator):
         midi_control = scene.MidiControl
         with open(self.filepath, "w") as outfile:
             outfile.write(midi_control.save(True))
-        midi_control.save()
         return {'FINISHED'}
 
     def invoke(self, context, event):
@@ -427,7 +746,6 @@ class MIDICONTROLLER_OP_Load(bpy.types.Operator):
             # Reading from json file
             print(f"Loading: {self.filepath} ")
             midi_control.load(external=True,external_json=openfile)
-        midi_control.save()
         return {'FINISHED'}
 
     def invoke(self, context, event):
@@ -456,26 +774,44 @@ class MIDICONTROLLER_PT_Panel_Device(bpy.types.Panel):
         # Very cheeky
         # midi_control.save_to_blend()
 
-        midi_control.screens = bpy.data.screens
         """define the layout of the panel"""
         box = layout.box()
         row = box.row()
 
         if midi_control.midi_input is not None:
-            if midi_control.midi_open:
-                row.operator(MIDICONTROLLER_OP_DisconnectMidi.bl_idname)
-            else:
+            row.label(text="Click To Connect Device:")
+            for port, name in enumerate(midi_control.available_ports):
                 row = box.row()
-                row.label(text="Click To Connect Device:")
-                for port, name in enumerate(midi_control.available_ports):
-                    row = box.row()
+                if name in midi_control.devices:
+                    op = row.operator(MIDICONTROLLER_OP_SelectMidiDevice.bl_idname,
+                                      text=name, depress=name == midi_control.connected_controller)
+                    op.device_name = name
+                    op = row.operator(
+                        MIDICONTROLLER_OP_DisconnectMidi.bl_idname, text="", icon="X")
+                    op.device_name = name
+                else:
                     op = row.operator(
                         MIDICONTROLLER_OP_ConnectMidi.bl_idname, text=name)
                     op.midi_port = port
+            if len(midi_control.devices) > 1:
+                row = box.row()
+                row.operator(MIDICONTROLLER_OP_DisconnectMidi.bl_idname,
+                             text="Disconnect All")
+            row = box.row()
+            row.operator(MIDICONTROLLER_OP_FindMidi.bl_idname, text="Refresh")
         else:
             # row.operator("mesh.primitive_cube_add", text="Add Cube")
             row.operator(MIDICONTROLLER_OP_FindMidi.bl_idname)
 
+        box = layout.box()
+        row = box.row()
+        if midi_control.replay.active:
+            row.label(text=f"Replaying: {midi_control.replay.position}/{len(midi_control.replay.entries)}")
+            op = row.operator(MIDICONTROLLER_OP_ReplayMidi.bl_idname, text="Stop")
+            op.stop = True
+        else:
+            row.operator_menu_enum(MIDICONTROLLER_OP_ReplayMidi.bl_idname, "pacing", text="Replay Journal/Midi File")
+
 
 # clasS NAMING CONVENTION ‘CATEGORY_PT_name’
 class MIDICONTROLLER_PT_Panel_Status(bpy.types.Panel):
@@ -499,19 +835,128 @@ class MIDICONTROLLER_PT_Panel_Status(bpy.types.Panel):
         if midi_control.midi_open:
             box = layout.box()
             row = box.row()
-            row.label(text=f"Connected Device:")
+            row.label(text=f"Configuring Device:")
             row = box.row()
             row.label(
                 text=f"{str(midi_control.connected_controller)}")
+            high_resolution = midi_control.active_device.high_resolution
+            op = row.operator(MIDICONTROLLER_OP_MidiHighResolution.bl_idname,
+                              text="14-bit/NRPN", depress=high_resolution)
+            op.enable = not high_resolution
+            if len(midi_control.devices) > 1:
+                row = box.row()
+                row.label(
+                    text=f"Last changed device: {midi_control.midi_last_device}")
             row = box.row()
             row.label(
-                text=f"Last changed control: {midi_control.midi_last_control_changed}")
+                text=f"Last changed control: {MidiController_Event.describe(midi_control.midi_last_control_changed)}")
             row = box.row()
             row.label(
                 text=f"Last value: {midi_control.midi_last_control_value}")
             row = box.row()
-            row.label(
-                text=f"Last velocity: {midi_control.midi_last_control_velocity}")
+            row.prop(scene.generic_properties, 'ui_redraw_rate', text="Redraws/s")
+            box = layout.box()
+            row = box.row()
+            row.prop(scene.generic_properties, 'journal_path', text="Journal")
+            row = box.row()
+            if midi_control.journal.is_open():
+                row.label(text=f"Journaled: {midi_control.journal.written}")
+                op = row.operator(MIDICONTROLLER_OP_MidiJournal.bl_idname, text="Stop Journal")
+                op.start = False
+                op.stop = True
+            else:
+                op = row.operator(MIDICONTROLLER_OP_MidiJournal.bl_idname, text="Start Journal")
+                op.start = True
+                op.stop = False
+            latency = midi_control.latency
+            box = layout.box()
+            row = box.row()
+            if latency.enabled:
+                op = row.operator(MIDICONTROLLER_OP_MidiLatency.bl_idname, text="Stop Measuring")
+                op.start = False
+                op.stop = True
+                op.reset = False
+            else:
+                op = row.operator(MIDICONTROLLER_OP_MidiLatency.bl_idname, text="Measure Latency")
+                op.start = True
+                op.stop = False
+                op.reset = False
+            op = row.operator(MIDICONTROLLER_OP_MidiLatency.bl_idname, text="", icon="TRASH")
+            op.start = False
+            op.stop = False
+            op.reset = True
+            row.operator(MIDICONTROLLER_OP_ExportLatency.bl_idname, text="", icon="EXPORT")
+            if latency.histograms["timer"].count > 0:
+                row = box.row()
+                row.label(text="ms: p50 / p95 / p99")
+                for stage, name, description in latency.stages:
+                    count, values, maximum = latency.summary(stage)
+                    if count == 0:
+                        continue
+                    row = box.row()
+                    row.label(text=f"{name}: " + " / ".join(f"{value * 1000.0:.2f}" for value in values))
+        else:
+            layout.label(text="Connect Midi Device First!")
+
+
+# clasS NAMING CONVENTION ‘CATEGORY_PT_name’
+class MIDICONTROLLER_PT_Panel_Profiler(bpy.types.Panel):
+
+    # where to add the panel in the UI
+    # 3D Viewport area (find list of values here https://docs.blender.org/api/current/bpy_types_enum_items/space_type_items.html#rna-enum-space-type-items)
+    bl_space_type = "VIEW_3D"
+    # Sidebar region (find list of values here https://docs.blender.org/api/current/bpy_types_enum_items/region_type_items.html#rna-enum-region-type-items)
+    bl_region_type = "UI"
+
+    bl_category = "MidiController"  # found in the Sidebar
+    bl_label = "Profiler"  # found at the top of the Panel
+    bl_description = "Cost of the updates of the plugin."
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+
+        scene = context.scene
+        midi_control = scene.MidiControl
+        profiler = midi_control.profiler
+        layout = self.layout
+
+        if midi_control.midi_open:
+            box = layout.box()
+            row = box.row()
+            if profiler.enabled:
+                op = row.operator(MIDICONTROLLER_OP_MidiProfiler.bl_idname, text="Stop Profiling")
+                op.start = False
+                op.stop = True
+                op.reset = False
+            else:
+                op = row.operator(MIDICONTROLLER_OP_MidiProfiler.bl_idname, text="Profile Updates")
+                op.start = True
+                op.stop = False
+                op.reset = False
+            op = row.operator(MIDICONTROLLER_OP_MidiProfiler.bl_idname, text="", icon="TRASH")
+            op.start = False
+            op.stop = False
+            op.reset = True
+            if profiler.times["tick"].count > 0:
+                row = box.row()
+                row.label(text="ms: mean / p95 / max, blocks")
+                for name, label in profiler.subsystems:
+                    ticks, mean, p95, maximum, blocks = profiler.summary(name)
+                    row = box.row()
+                    row.label(text=f"{label}: {mean * 1000.0:.2f} / {p95 * 1000.0:.2f} / {maximum * 1000.0:.2f}, {blocks:+.0f}")
+
+            box = layout.box()
+            row = box.row()
+            row.prop(scene.generic_properties, 'profile_path', text="Profile")
+            row = box.row()
+            if profiler.is_capturing():
+                op = row.operator(MIDICONTROLLER_OP_MidiProfileCapture.bl_idname, text="Stop Capture")
+                op.start = False
+                op.stop = True
+            else:
+                op = row.operator(MIDICONTROLLER_OP_MidiProfileCapture.bl_idname, text="Start Capture")
+                op.start = True
+                op.stop = False
         else:
             layout.label(text="Connect Midi Device First!")
 
@@ -540,7 +985,7 @@ class MIDICONTROLLER_PT_Panel_BindKeyFrameInput(bpy.types.Panel):
             box = layout.box()
             row = box.row()
             row.label(
-                text=f"Bound To: {midi_control.key_frame_control}")
+                text=f"Bound To: {MidiController_Event.describe(midi_control.key_frame_control)}")
             row = box.row()
             if midi_control.key_frame_control is None:
                 op = row.operator(
@@ -561,6 +1006,46 @@ class MIDICONTROLLER_PT_Panel_BindKeyFrameInput(bpy.types.Panel):
             layout.label(text="Connect Midi Device First!")
 
 
+# clasS NAMING CONVENTION ‘CATEGORY_PT_name’
+class MIDICONTROLLER_PT_Panel_RecordPerformance(bpy.types.Panel):
+
+    # where to add the panel in the UI
+    # 3D Viewport area (find list of values here https://docs.blender.org/api/current/bpy_types_enum_items/space_type_items.html#rna-enum-space-type-items)
+    bl_space_type = "VIEW_3D"
+    # Sidebar region (find list of values here https://docs.blender.org/api/current/bpy_types_enum_items/region_type_items.html#rna-enum-region-type-items)
+    bl_region_type = "UI"
+
+    bl_category = "MidiController"  # found in the Sidebar
+    bl_label = "Record Performance"  # found at the top of the Panel
+    bl_description = "Record mapped controls during playback as keyframes."
+
+    def draw(self, context):
+
+        scene = context.scene
+        midi_control = scene.MidiControl
+        layout = self.layout
+
+        if midi_control.midi_open:
+            box = layout.box()
+            row = box.row()
+            if midi_control.recorder.recording:
+                row.label(text=f"Recording: {midi_control.recorder.count()} values")
+                row = box.row()
+                op = row.operator(
+                    MIDICONTROLLER_OP_RecordPerformance.bl_idname, text="Stop Recording")
+                op.start = False
+                op.stop = True
+            else:
+                row.label(text="Records the selected objects.")
+                row = box.row()
+                op = row.operator(
+                    MIDICONTROLLER_OP_RecordPerformance.bl_idname, text="Start Recording")
+                op.start = True
+                op.stop = False
+        else:
+            layout.label(text="Connect Midi Device First!")
+
+
 # clasS NAMING CONVENTION ‘CATEGORY_PT_name’
 class MIDICONTROLLER_PT_Panel_RegisterControllerMapping(bpy.types.Panel):
 
@@ -599,13 +1084,13 @@ class MIDICONTROLLER_PT_Panel_RegisterControllerMapping(bpy.types.Panel):
                     midi_control.current_mapping_state = midi_control.State.REGISTER_CONTROL
                 elif midi_control.current_mapping_state == midi_control.State.REGISTER_CONTROL:
                     box = layout.box()
-                    controller_name = midi_control.midi_control_to_map
-                    if midi_control.midi_control_to_map in midi_control.controller_names:
+                    controller_name = MidiController_Event.describe(midi_control.midi_control_to_map)
+                    if str(midi_control.midi_control_to_map) in midi_control.controller_names:
                         controller_name = midi_control.controller_names[
-                            midi_control.midi_control_to_map]
+                            str(midi_control.midi_control_to_map)]
                     row = box.row()
                     row.label(
-                        text=f"Mapping Controller: {controller_name} ({midi_control.midi_control_to_map})")
+                        text=f"Mapping Controller: {controller_name} ({MidiController_Event.describe(midi_control.midi_control_to_map)})")
                     row = box.row()
                     row.label(text=f"Touch other control to change!")
                     box = layout.box()
@@ -613,17 +1098,17 @@ class MIDICONTROLLER_PT_Panel_RegisterControllerMapping(bpy.types.Panel):
                     row.label(text=f"2. Now change object property to map!")
                 elif midi_control.current_mapping_state == midi_control.State.CONFIGURE_MAPPING:
                     box = layout.box()
-                    controller_name = midi_control.midi_control_to_map
-                    if midi_control.midi_control_to_map in midi_control.controller_names:
+                    controller_name = MidiController_Event.describe(midi_control.midi_control_to_map)
+                    if str(midi_control.midi_control_to_map) in midi_control.controller_names:
                         controller_name = midi_control.controller_names[
-                            midi_control.midi_control_to_map]
+                            str(midi_control.midi_control_to_map)]
 
                     if get_scene_prop_val('generic_properties', 'new_controller_name', scene.name) == "":
                         update_scene_prop('generic_properties', 'new_controller_name', f"NewMapping_{len(midi_control.controller_property_mapping.keys())}", scene.name)
 
                     row = box.row()
                     row.label(
-                        text=f"Mapping Controller: {controller_name} ({midi_control.midi_control_to_map})")
+                        text=f"Mapping Controller: {controller_name} ({MidiController_Event.describe(midi_control.midi_control_to_map)})")
                     row = box.row()
                     row.label(text=f"Touch other control to change!")
                     box = layout.box()
@@ -644,12 +1129,25 @@ class MIDICONTROLLER_PT_Panel_RegisterControllerMapping(bpy.types.Panel):
                     row = box.row()
                     row.prop(generic_properties,
                              'new_prop_max', text="Max")
+                    stored = MidiController_Storage.find_device(
+                        MidiController_Storage.get(), midi_control.connected_controller)
+                    if stored is not None:
+                        row = box.row()
+                        row.prop_search(generic_properties, 'new_target_group',
+                                        stored, 'selection_groups', text="Selection Group")
+                    row = box.row()
+                    row.prop_search(generic_properties, 'new_target_collection',
+                                    bpy.data, 'collections', text="Collection")
+                    row = box.row()
+                    row.label(text="(Empty: selected objects)")
                     row = box.row()
                     op = row.operator(
                         MIDICONTROLLER_OP_SavePropertyMapping.bl_idname, text="Apply")
                     op.controller_name = generic_properties.new_controller_name
                     op.min = generic_properties.new_prop_min
                     op.max = generic_properties.new_prop_max
+                    op.target_collection = generic_properties.new_target_collection
+                    op.target_group = generic_properties.new_target_group
                     op.cancel = False
                     row = box.row()
                     op = row.operator(
@@ -660,6 +1158,25 @@ class MIDICONTROLLER_PT_Panel_RegisterControllerMapping(bpy.types.Panel):
 
 
 # clasS NAMING CONVENTION ‘CATEGORY_PT_name’
+class MIDICONTROLLER_UL_MappedControls(bpy.types.UIList):
+    """Mapped properties of the configured device, click one to edit it."""
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        midi_control = context.scene.MidiControl
+        controller_name = MidiController_Event.describe(item.control)
+        if str(item.control) in midi_control.controller_names:
+            controller_name = midi_control.controller_names[str(item.control)]
+        op = layout.operator(
+            MIDICONTROLLER_OP_UpdatePropertyMapping.bl_idname, text=f"{controller_name}: {item.name}", emboss=False)
+        op.edit = True
+        op.save = False
+        op.delete = False
+        op.cancel = False
+        op.index = item.position
+        op.midi_control = str(item.control)
+        op.mapped_property = item.name
+
+
 class MIDICONTROLLER_PT_Panel_MappedControls(bpy.types.Panel):
 
     # where to add the panel in the UI
@@ -682,32 +1199,22 @@ class MIDICONTROLLER_PT_Panel_MappedControls(bpy.types.Panel):
 
             box = layout.box()
             if midi_control.edit_state == midi_control.EditState.NONE:
-                for controller, mapping in midi_control.controller_property_mapping.items():
-                    box.separator()
-                    nbox = box.box()
-                    controller_names = controller
-                    if controller in midi_control.controller_names:
-                        controller_names = midi_control.controller_names[controller]
-                    nbox.label(text=f"Controller: {controller_names}")
-                    for index, mapped in enumerate(mapping):
-                        row = nbox.row()
-                        op = row.operator(
-                            MIDICONTROLLER_OP_UpdatePropertyMapping.bl_idname, text=f"{mapped['name']}")
-                        op.edit = True
-                        op.save = False
-                        op.delete = False
-                        op.cancel = False
-                        op.index = index
-                        op.midi_control = controller
-                        op.mapped_property = mapped['name']
+                stored = MidiController_Storage.find_device(
+                    MidiController_Storage.get(), midi_control.connected_controller)
+                if stored is None:
+                    box.label(text="Nothing mapped yet!")
+                else:
+                    # Only the visible rows are drawn.
+                    box.template_list("MIDICONTROLLER_UL_MappedControls", "", stored,
+                                      "mappings", stored, "active_mapping_index")
 
             elif midi_control.edit_state == midi_control.EditState.EDIT:
                 box.separator()
                 row = box.row()
-                controller_names = midi_control.midi_control_to_map
-                if midi_control.midi_control_to_map in midi_control.controller_names:
+                controller_names = MidiController_Event.describe(midi_control.editting_controller)
+                if midi_control.editting_controller in midi_control.controller_names:
                     controller_names = midi_control.controller_names[
-                        midi_control.midi_control_to_map]
+                        midi_control.editting_controller]
 
                 row.label(
                     text=f"Control: {controller_names}, Mapped: {midi_control.editting_mapped}")
@@ -726,6 +1233,48 @@ class MIDICONTROLLER_PT_Panel_MappedControls(bpy.types.Panel):
                 box.row()
                 box.prop(generic_properties, 'edit_prop_max',
                          text="Max")
+                box.row()
+                box.prop(generic_properties, 'edit_simplify_tolerance',
+                         text="Recording Simplify Tolerance")
+                stored = MidiController_Storage.find_device(
+                    MidiController_Storage.get(), midi_control.connected_controller)
+                if stored is not None:
+                    box.row()
+                    box.prop_search(generic_properties, 'edit_target_group',
+                                    stored, 'selection_groups', text="Selection Group")
+                box.row()
+                box.prop_search(generic_properties, 'edit_target_collection',
+                                bpy.data, 'collections', text="Collection")
+                box.row()
+                box.prop(generic_properties, 'edit_curve_type',
+                         text="Response Curve")
+                if generic_properties.edit_curve_type in ["LOG", "EXP", "S_CURVE"]:
+                    box.prop(generic_properties, 'edit_curve_amount',
+                             text="Curve Amount")
+                elif generic_properties.edit_curve_type == "STEPPED":
+                    box.prop(generic_properties, 'edit_curve_steps',
+                             text="Steps")
+                elif generic_properties.edit_curve_type == "CUSTOM":
+                    curve_node = MidiController_Curves.get_curve_node()
+                    if curve_node is not None:
+                        box.template_curve_mapping(curve_node, "mapping")
+                box.prop(generic_properties, 'edit_curve_invert',
+                         text="Invert")
+                box.row()
+                box.prop(generic_properties, 'edit_filter_mode',
+                         text="Smoothing")
+                if generic_properties.edit_filter_mode == "EXPONENTIAL":
+                    box.prop(generic_properties, 'edit_filter_time_constant',
+                             text="Time Constant (s)")
+                elif generic_properties.edit_filter_mode == "ONE_EURO":
+                    box.prop(generic_properties, 'edit_filter_min_cutoff',
+                             text="Min Cutoff (Hz)")
+                    box.prop(generic_properties, 'edit_filter_beta',
+                             text="Beta")
+                box.prop(generic_properties, 'edit_filter_deadband',
+                         text="Dead-band")
+                box.prop(generic_properties, 'edit_filter_epsilon',
+                         text="Min Change To Write")
 
 
                 row = box.row()
@@ -733,6 +1282,19 @@ class MIDICONTROLLER_PT_Panel_MappedControls(bpy.types.Panel):
                     MIDICONTROLLER_OP_UpdatePropertyMapping.bl_idname, text="Apply")
                 op.min = generic_properties.edit_prop_min
                 op.max = generic_properties.edit_prop_max
+                op.simplify_tolerance = generic_properties.edit_simplify_tolerance
+                op.target_collection = generic_properties.edit_target_collection
+                op.target_group = generic_properties.edit_target_group
+                op.curve_type = generic_properties.edit_curve_type
+                op.curve_amount = generic_properties.edit_curve_amount
+                op.curve_steps = generic_properties.edit_curve_steps
+                op.curve_invert = generic_properties.edit_curve_invert
+                op.filter_mode = generic_properties.edit_filter_mode
+                op.filter_time_constant = generic_properties.edit_filter_time_constant
+                op.filter_min_cutoff = generic_properties.edit_filter_min_cutoff
+                op.filter_beta = generic_properties.edit_filter_beta
+                op.filter_deadband = generic_properties.edit_filter_deadband
+                op.filter_epsilon = generic_properties.edit_filter_epsilon
                 op.controller_name = generic_properties.edit_controller_name
                 op.edit = False
                 op.save = True
@@ -812,7 +1374,7 @@ class MIDICONTROLLER_PT_Panel_SelectionGroups(bpy.types.Panel):
             for controller, mapped in midi_control.controller_selection_mapping.items():
                 row = layout.row()
                 nbox = row.box()
-                nbox.label(text=f"Group: {mapped['name']}, Mapped To: {controller}")
+                nbox.label(text=f"Group: {mapped['name']}, Mapped To: {MidiController_Event.describe(controller)}")
                 row = nbox.row()
                 op = row.operator(
                     MIDICONTROLLER_OP_DeleteSelectionGroup.bl_idname, text=f"Delete")
@@ -847,7 +1409,7 @@ class MIDICONTROLLER_PT_Panel_FramePosition(bpy.types.Panel):
                 box = layout.box()
                 row = box.row()
                 row.label(
-                text=f"Increase Control: {midi_control.controllers_to_set_frame['increase']['controller']}")
+                text=f"Increase Control: {MidiController_Event.describe(midi_control.controllers_to_set_frame['increase']['controller'])}")
                 row = box.row()
                 op = row.operator(
                     MIDICONTROLLER_OP_MapFrameSelection.bl_idname, text="Map Control")
@@ -860,12 +1422,12 @@ class MIDICONTROLLER_PT_Panel_FramePosition(bpy.types.Panel):
                 box = layout.box()
                 row = box.row()
                 row.label(
-                    text=f"Decrease Control: {midi_control.controllers_to_set_frame['decrease']['controller']}")
+                    text=f"Decrease Control: {MidiController_Event.describe(midi_control.controllers_to_set_frame['decrease']['controller'])}")
             elif midi_control.controllers_to_set_frame["increase"]["state"] == midi_control.ControllerButtonBindingState.PENDING:
                 box = layout.box()
                 row = box.row()
                 row.label(
-                text=f"Increase Control: {midi_control.controllers_to_set_frame['increase']['controller']}")
+                text=f"Increase Control: {MidiController_Event.describe(midi_control.controllers_to_set_frame['increase']['controller'])}")
                 row = box.row()
                 row.label(text="Change a midi control,")
                 row = box.row()
@@ -877,16 +1439,16 @@ class MIDICONTROLLER_PT_Panel_FramePosition(bpy.types.Panel):
                 box = layout.box()
                 row = box.row()
                 row.label(
-                    text=f"Decrease Control: {midi_control.controllers_to_set_frame['decrease']['controller']}")
+                    text=f"Decrease Control: {MidiController_Event.describe(midi_control.controllers_to_set_frame['decrease']['controller'])}")
             elif midi_control.controllers_to_set_frame["decrease"]["state"] == midi_control.ControllerButtonBindingState.NONE:
                 box = layout.box()
                 row = box.row()
                 row.label(
-                text=f"Increase Control: {midi_control.controllers_to_set_frame['increase']['controller']}")
+                text=f"Increase Control: {MidiController_Event.describe(midi_control.controllers_to_set_frame['increase']['controller'])}")
                 box = layout.box()
                 row = box.row()
                 row.label(
-                    text=f"Decrease Control: {midi_control.controllers_to_set_frame['decrease']['controller']}")
+                    text=f"Decrease Control: {MidiController_Event.describe(midi_control.controllers_to_set_frame['decrease']['controller'])}")
                 row = box.row()
                 op = row.operator(
                     MIDICONTROLLER_OP_MapFrameSelection.bl_idname, text="Map Control")
@@ -900,11 +1462,11 @@ class MIDICONTROLLER_PT_Panel_FramePosition(bpy.types.Panel):
                 box = layout.box()
                 row = box.row()
                 row.label(
-                text=f"Increase Control: {midi_control.controllers_to_set_frame['increase']['controller']}")
+                text=f"Increase Control: {MidiController_Event.describe(midi_control.controllers_to_set_frame['increase']['controller'])}")
                 box = layout.box()
                 row = box.row()
                 row.label(
-                    text=f"Decrease Control: {midi_control.controllers_to_set_frame['decrease']['controller']}")
+                    text=f"Decrease Control: {MidiController_Event.describe(midi_control.controllers_to_set_frame['decrease']['controller'])}")
                 row = box.row()
                 row.label(text="Change a midi control,")
                 row = box.row()
@@ -917,12 +1479,12 @@ class MIDICONTROLLER_PT_Panel_FramePosition(bpy.types.Panel):
                 box = layout.box()
                 row = box.row()
                 row.label(
-                    text=f"Increase Control: {midi_control.controllers_to_set_frame['increase']['controller']}")
+                    text=f"Increase Control: {MidiController_Event.describe(midi_control.controllers_to_set_frame['increase']['controller'])}")
 
                 box = layout.box()
                 row = box.row()
                 row.label(
-                    text=f"Decrease Control: {midi_control.controllers_to_set_frame['decrease']['controller']}")
+                    text=f"Decrease Control: {MidiController_Event.describe(midi_control.controllers_to_set_frame['decrease']['controller'])}")
 
                 box = layout.box()
                 row = box.row()
@@ -1197,9 +1759,12 @@ class MIDICONTROLLER_OP_LoadPlugin(bpy.types.Operator):
 
 
 classes = (MIDICONTROLLER_GenericProperties,
+           MIDICONTROLLER_UL_MappedControls,
            MIDICONTROLLER_PT_Panel_Device,
            MIDICONTROLLER_PT_Panel_Status,
+           MIDICONTROLLER_PT_Panel_Profiler,
            MIDICONTROLLER_PT_Panel_BindKeyFrameInput,
+           MIDICONTROLLER_PT_Panel_RecordPerformance,
            MIDICONTROLLER_PT_Panel_RegisterControllerMapping,
            MIDICONTROLLER_PT_Panel_MappedControls,
            MIDICONTROLLER_PT_Panel_SelectionGroups,
@@ -1208,9 +1773,18 @@ classes = (MIDICONTROLLER_GenericProperties,
            MIDICONTROLLER_OP_FindMidi,
            MIDICONTROLLER_OP_ConnectMidi,
            MIDICONTROLLER_OP_DisconnectMidi,
+           MIDICONTROLLER_OP_MidiJournal,
+           MIDICONTROLLER_OP_ReplayMidi,
+           MIDICONTROLLER_OP_MidiHighResolution,
+           MIDICONTROLLER_OP_MidiLatency,
+           MIDICONTROLLER_OP_ExportLatency,
+           MIDICONTROLLER_OP_MidiProfiler,
+           MIDICONTROLLER_OP_MidiProfileCapture,
+           MIDICONTROLLER_OP_SelectMidiDevice,
            MIDICONTROLLER_OP_SavePropertyMapping,
            MIDICONTROLLER_OP_UpdatePropertyMapping,
            MIDICONTROLLER_OP_UpdateKeyFrameMapping,
+           MIDICONTROLLER_OP_RecordPerformance,
            MIDICONTROLLER_OP_MapSelectionGroup,
            MIDICONTROLLER_OP_DeleteSelectionGroup,
            MIDICONTROLLER_OP_MapFrameSelection,
@@ -1245,28 +1819,32 @@ def get_scene_prop_val(prop, name, scene_name=None):
 def updatetimer():
     # print("update timer called")
     global midicontrol_instance
-    midicontrol_instance.obj_prop_change_update()
-    midicontrol_instance.parse_midi_messages_update()
-    midicontrol_instance.frame_update()
-    return midicontrol_instance.midi_update_rate
+    if not midicontrol_instance.midi_open:
+        return None
+    return midicontrol_instance.update()
 
 
 @persistent
 def load_post(dummy):
     print("Finished load")
     try:
-        bpy.app.timers.unregister(updatetimer)
+        if bpy.app.timers.is_registered(updatetimer):
+            bpy.app.timers.unregister(updatetimer)
     except Exception as e:
         print("Failed to unregister timer")
         print(e)
-    bpy.app.timers.register(updatetimer)
-    midicontrol_instance.close()
+    midicontrol_instance.close(discard=True)
+
+@persistent
+def depsgraph_update_post(scene, depsgraph):
+    global midicontrol_instance
+    midicontrol_instance.on_depsgraph_update(scene, depsgraph)
 
 @persistent
 def save_pre(dummy):
     print("Finished save")
     global midicontrol_instance
-    midicontrol_instance.save()
+    midicontrol_instance.flush_save()
 
 def register():
     print("registering plugin")
@@ -1290,10 +1868,15 @@ def register():
 
     bpy.types.Scene.generic_properties = bpy.props.PointerProperty(
         type=MIDICONTROLLER_GenericProperties)
-    bpy.app.timers.register(updatetimer)
+
+    for cls in storage_classes:
+        bpy.utils.register_class(cls)
+    bpy.types.Scene.midi_control_storage = bpy.props.PointerProperty(
+        type=MIDICONTROLLER_Storage)
 
     bpy.app.handlers.load_post.append(load_post)
     bpy.app.handlers.save_pre.append(save_pre)
+    bpy.app.handlers.depsgraph_update_post.append(depsgraph_update_post)
 
 
 def unregister():
@@ -1321,11 +1904,15 @@ def unregister():
         print(e)
 
     try:
-        bpy.app.timers.unregister(updatetimer)
+        if bpy.app.timers.is_registered(updatetimer):
+            bpy.app.timers.unregister(updatetimer)
     except Exception as e:
         print("Failed to unregister timer")
         print(e)
 
+    if depsgraph_update_post in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(depsgraph_update_post)
+
     for cls in classes:
         try:
             bpy.utils.unregister_class(cls)
@@ -1333,6 +1920,14 @@ def unregister():
             print(f"Could not unregister: {cls.bl_label}")
             print(e)
 
+    del bpy.types.Scene.midi_control_storage
+    for cls in reversed(storage_classes):
+        try:
+            bpy.utils.unregister_class(cls)
+        except Exception as e:
+            print(f"Could not unregister: {cls.__name__}")
+            print(e)
+
     del bpy.types.Scene.MidiControl
 
 
@@ -0,0 +1,330 @@
+"""
+A small stand-in for the parts of bpy the add-on uses on its hot paths.
+
+Only meant for benchmarking outside of blender: objects are plain python objects,
+property groups are built from their annotations and F-Curves keep their points in lists.
+foreach_get/foreach_set and keyframe points are python here and C in blender, so compare
+the collection, keyframe and save cases in blender before drawing conclusions from them.
+"""
+import itertools
+import sys
+import types as python_types
+
+
+class Prop():
+    def __init__(self, kind, **options):
+        self.kind = kind
+        self.options = options
+
+    def create(self):
+        if self.kind == "COLLECTION":
+            return Collection(self.options["type"])
+        if self.kind == "POINTER":
+            return self.options["type"]()
+        if self.kind == "FLOAT_VECTOR":
+            return list(self.options.get("default", [0.0] * self.options.get("size", 3)))
+        defaults = {"FLOAT": 0.0, "INT": 0, "BOOL": False, "STRING": "", "ENUM": ""}
+        return self.options.get("default", defaults[self.kind])
+
+
+def make_props():
+    props = python_types.ModuleType("bpy.props")
+    props.FloatProperty = lambda **options: Prop("FLOAT", **options)
+    props.IntProperty = lambda **options: Prop("INT", **options)
+    props.BoolProperty = lambda **options: Prop("BOOL", **options)
+    props.StringProperty = lambda **options: Prop("STRING", **options)
+    props.EnumProperty = lambda **options: Prop("ENUM", **options)
+    props.FloatVectorProperty = lambda **options: Prop("FLOAT_VECTOR", **options)
+    props.CollectionProperty = lambda **options: Prop("COLLECTION", **options)
+    props.PointerProperty = lambda **options: Prop("POINTER", **options)
+    return props
+
+
+class PropertyGroup():
+    def __init__(self):
+        self.name = ""
+        for cls in reversed(type(self).__mro__):
+            for name, prop in cls.__dict__.get("__annotations__", {}).items():
+                if isinstance(prop, Prop):
+                    setattr(self, name, prop.create())
+
+
+class Collection(list):
+    """bpy_prop_collection of property groups."""
+
+    def __init__(self, type=PropertyGroup):
+        list.__init__(self)
+        self.type = type
+
+    def add(self):
+        item = self.type()
+        self.append(item)
+        return item
+
+    def get(self, name, default=None):
+        for item in self:
+            if item.name == name:
+                return item
+        return default
+
+
+class Property():
+    def __init__(self, identifier, type, array_length=0):
+        self.identifier = identifier
+        self.type = type
+        self.array_length = array_length
+        self.array_dimensions = (array_length, 0, 0)
+        self.is_readonly = False
+
+
+class RNA():
+    def __init__(self, properties):
+        self.properties = PropertyMap(properties)
+
+
+class PropertyMap(list):
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            for prop in self:
+                if prop.identifier == key:
+                    return prop
+            raise KeyError(key)
+        return list.__getitem__(self, key)
+
+
+class KeyframePoints():
+    def __init__(self):
+        self.co = []
+
+    def __len__(self):
+        return len(self.co) // 2
+
+    def __getitem__(self, index):
+        if index < 0 or index >= len(self):
+            raise IndexError(index)
+        return python_types.SimpleNamespace(index=index)
+
+    def add(self, count):
+        self.co += [0.0] * (count * 2)
+
+    def remove(self, point, fast=False):
+        del self.co[point.index * 2:point.index * 2 + 2]
+
+    def clear(self):
+        self.co = []
+
+    def foreach_get(self, name, seq):
+        seq[:] = self.co
+
+    def foreach_set(self, name, seq):
+        self.co = [float(value) for value in seq]
+
+
+class FCurve():
+    def __init__(self, data_path, index):
+        self.data_path = data_path
+        self.array_index = index
+        self.keyframe_points = KeyframePoints()
+
+    def update(self):
+        pairs = sorted(zip(self.keyframe_points.co[0::2], self.keyframe_points.co[1::2]))
+        self.keyframe_points.co = [value for pair in pairs for value in pair]
+
+
+class FCurves(list):
+    def find(self, data_path, index=0):
+        for fcurve in self:
+            if fcurve.data_path == data_path and fcurve.array_index == index:
+                return fcurve
+        return None
+
+
+class Action():
+    def __init__(self):
+        self.fcurves = FCurves()
+
+
+class AnimData():
+    def __init__(self):
+        self.action = Action()
+
+
+class Object():
+    array_properties = ["location", "rotation_euler", "scale",
+                        "delta_location", "delta_rotation_euler", "delta_scale"]
+    bl_rna = RNA([Property(name, "FLOAT", 3) for name in array_properties] +
+                 [Property("pass_index", "INT")])
+
+    session_uids = itertools.count(1)
+
+    def __init__(self, name):
+        self.name = name
+        self.session_uid = next(Object.session_uids)
+        self.location = [0.0, 0.0, 0.0]
+        self.rotation_euler = [0.0, 0.0, 0.0]
+        self.scale = [1.0, 1.0, 1.0]
+        self.delta_location = [0.0, 0.0, 0.0]
+        self.delta_rotation_euler = [0.0, 0.0, 0.0]
+        self.delta_scale = [1.0, 1.0, 1.0]
+        self.pass_index = 0
+        self.hide_render = False
+        self.animation_data = None
+        self.custom = {}
+        self.selected = False
+
+    def __contains__(self, key):
+        return key in self.custom
+
+    def __getitem__(self, key):
+        return self.custom[key]
+
+    def __setitem__(self, key, value):
+        self.custom[key] = value
+
+    def keys(self):
+        return self.custom.keys()
+
+    def update_tag(self, refresh=None):
+        pass
+
+    def select_get(self):
+        return self.selected
+
+    def select_set(self, state):
+        self.selected = state
+
+    def path_resolve(self, path, coerce=True):
+        return getattr(self, path)
+
+    def keyframe_insert(self, data_path, index=-1):
+        if self.animation_data is None:
+            self.animation_data = AnimData()
+        fcurves = self.animation_data.action.fcurves
+        fcurve = fcurves.find(data_path, index)
+        if fcurve is None:
+            fcurve = FCurve(data_path, index)
+            fcurves.append(fcurve)
+        fcurve.keyframe_points.add(1)
+        return True
+
+
+class ObjectList(list):
+    """Collection of objects with foreach_get/foreach_set like bpy_prop_collection."""
+
+    def foreach_get(self, prop, seq):
+        values = []
+        for obj in self:
+            values.extend(getattr(obj, prop))
+        seq[:] = values
+
+    def foreach_set(self, prop, seq):
+        i = 0
+        for obj in self:
+            length = len(getattr(obj, prop))
+            setattr(obj, prop, [float(value) for value in seq[i:i + length]])
+            i += length
+
+    def get(self, name, default=None):
+        for obj in self:
+            if obj.name == name:
+                return obj
+        return default
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.get(key)
+        return list.__getitem__(self, key)
+
+
+class ObjectCollection():
+    def __init__(self, name, objects=None):
+        self.name = name
+        self.all_objects = ObjectList(objects or [])
+
+
+class DataCollection(dict):
+    def get(self, name, default=None):
+        return dict.get(self, name, default)
+
+    def new(self, name, *args):
+        item = python_types.SimpleNamespace(name=name)
+        self[name] = item
+        return item
+
+    def __iter__(self):
+        return iter(self.values())
+
+
+class Render():
+    fps = 24
+    fps_base = 1.0
+
+
+class Scene():
+    def __init__(self):
+        self.name = "Scene"
+        self.frame_current = 1
+        self.render = Render()
+        self.midi_control_storage = None
+
+    def frame_set(self, frame):
+        self.frame_current = frame
+
+
+class Screen():
+    is_animation_playing = False
+
+
+class Timers():
+    def __init__(self):
+        self.registered = []
+
+    def register(self, function, first_interval=0, persistent=False):
+        self.registered.append(function)
+
+    def is_registered(self, function):
+        return function in self.registered
+
+    def unregister(self, function):
+        self.registered.remove(function)
+
+
+def install():
+    """Put the stand-in in sys.modules as bpy, returns it.
+    """
+    bpy = python_types.ModuleType("bpy")
+    bpy.props = make_props()
+    bpy.types = python_types.ModuleType("bpy.types")
+    bpy.types.PropertyGroup = PropertyGroup
+    bpy.types.Object = Object
+
+    bpy.app = python_types.ModuleType("bpy.app")
+    bpy.app.timers = Timers()
+    bpy.app.background = True
+
+    bpy.msgbus = python_types.SimpleNamespace(
+        subscribe_rna=lambda **options: None,
+        clear_by_owner=lambda owner: None)
+
+    scene = Scene()
+    bpy.data = python_types.SimpleNamespace(
+        objects=ObjectList(),
+        collections=DataCollection(),
+        texts=DataCollection(),
+        node_groups=DataCollection(),
+        scenes=[scene])
+    bpy.context = python_types.SimpleNamespace(
+        scene=scene,
+        screen=Screen(),
+        selected_objects=[],
+        window_manager=python_types.SimpleNamespace(windows=[]))
+    bpy.stub = True
+
+    sys.modules["bpy"] = bpy
+    sys.modules["bpy.props"] = bpy.props
+    sys.modules["bpy.types"] = bpy.types
+    sys.modules["bpy.app"] = bpy.app
+    return bpy
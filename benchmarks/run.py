@@ -0,0 +1,329 @@
+"""
+End-to-end benchmarks of the midi input path: read, decode, coalesce, dispatch and write.
+
+Every tick runs MidiController_Midi.update, the step list the update timer runs. Outside
+of blender the add-on runs on the bpy stand-in of bpy_stub.py, which measures the cost of
+the add-on itself. Inside blender the same cases write real objects:
+
+    python benchmarks/run.py
+    blender -b --factory-startup --python benchmarks/run.py -- --check
+
+Options (after -- when running in blender):
+    --case NAME       only run cases whose name contains NAME, can be repeated
+    --ticks N         updates per case (default 200)
+    --repeat N        runs per case, the best run is reported (default 3)
+    --check           exit with 1 when a case regressed against the stored baseline
+    --save            store the results as the baseline
+    --tolerance F     allowed regression before --check fails (default 0.25)
+
+Baselines are stored per backend in benchmarks/baselines/, they only compare well on the
+machine that made them. Only the stub baseline is stored, run with --save in blender to
+create baselines/blender.json.
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import sys
+import time
+import types
+
+benchmark_directory = os.path.dirname(os.path.abspath(__file__))
+addon_directory = os.path.dirname(benchmark_directory)
+sys.path.insert(0, benchmark_directory)
+
+try:
+    import bpy
+except ImportError:
+    import bpy_stub
+    bpy = bpy_stub.install()
+
+import scenarios
+
+backend = "stub" if getattr(bpy, "stub", False) else "blender"
+package_name = "midicontroller_benchmark"
+
+
+def load_addon():
+    # Only the midi modules, __init__ registers the ui and needs rtmidi.
+    package = types.ModuleType(package_name)
+    package.__path__ = [addon_directory]
+    sys.modules[package_name] = package
+    midi_control = importlib.import_module(f"{package_name}.MidiControl")
+    storage = midi_control.MIDICONTROLLER_Storage
+    if backend == "stub":
+        bpy.context.scene.midi_control_storage = storage()
+    elif not hasattr(bpy.types.Scene, "midi_control_storage"):
+        for cls in midi_control.storage_classes:
+            bpy.utils.register_class(cls)
+        bpy.types.Scene.midi_control_storage = bpy.props.PointerProperty(type=storage)
+    return midi_control
+
+
+def percentile(values, fraction):
+    if len(values) == 0:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def summary(count, seconds, latencies, times):
+    # Times in milliseconds, rate per second.
+    def ms(value):
+        return None if value is None else round(value * 1000.0, 4)
+    return {
+        "rate": round(count / seconds, 1) if seconds > 0 else None,
+        "latency_p50": ms(percentile(latencies, 0.5)),
+        "latency_p95": ms(percentile(latencies, 0.95)),
+        "latency_p99": ms(percentile(latencies, 0.99)),
+        "time_p50": ms(percentile(times, 0.5)),
+        "time_p95": ms(percentile(times, 0.95)),
+        "time_max": ms(max(times) if times else None),
+    }
+
+
+class Bench():
+    """Runs a case on one MidiController_Midi, closed again between cases.
+    """
+
+    def __init__(self, midi_control):
+        self.module = midi_control
+        self.midi = midi_control.MidiController_Midi()
+        self.midi.save_debounce = 0
+        self.latencies = []
+        dispatch = self.midi.midi_callback
+
+        def midi_callback(event):
+            # Arrival (queue) time to the end of the dispatch, the timer wait is not included.
+            dispatch(event)
+            self.latencies.append(time.perf_counter() - event[4])
+        self.midi.midi_callback = midi_callback
+
+    def setup(self, objects, mappings, target_collection="", filter=None, groups=0):
+        scenarios.clear_scene(bpy)
+        scene_objects = scenarios.build_scene(bpy, objects)
+        midi = self.midi
+        if midi.midi_open:
+            midi.close()
+        device = midi.open_device("Benchmark", None, None, virtual=True)
+        event_class = self.module.MidiController_Event
+        target_groups = None
+        if groups > 0:
+            device.controller_selection_mapping = scenarios.build_selection_groups(
+                event_class, scene_objects, groups)
+            target_groups = [group["name"] for group in device.controller_selection_mapping.values()]
+        device.controller_property_mapping = scenarios.build_mappings(
+            event_class, mappings, target_collection, filter, target_groups)
+        midi.compile_mappings(device)
+        return device
+
+    def run_input(self, generator):
+        """Push the messages of every tick into the queue and run an update on them.
+        """
+        midi = self.midi
+        queue = midi.midi_queue
+        self.latencies = []
+        times = []
+        count = 0
+        start = time.perf_counter()
+        for messages in generator:
+            tick_start = time.perf_counter()
+            for message in messages:
+                queue.append((message, 0.0, time.perf_counter(), 0))
+            midi.update()
+            times.append(time.perf_counter() - tick_start)
+            count += len(messages)
+        # Filtered mappings keep writing until they settle.
+        while len(midi.active_filters) > 0:
+            midi.update()
+        return summary(count, time.perf_counter() - start, self.latencies, times)
+
+    def run_operation(self, operation, repeat):
+        times = []
+        start = time.perf_counter()
+        for i in range(repeat):
+            operation_start = time.perf_counter()
+            operation(i)
+            times.append(time.perf_counter() - operation_start)
+        return summary(repeat, time.perf_counter() - start, [], times)
+
+    def close(self):
+        if self.midi.midi_open:
+            self.midi.close()
+        scenarios.clear_scene(bpy)
+
+
+def input_case(objects, mappings, source, target_collection="", filter=None, groups=0):
+    def run(bench, ticks):
+        bench.setup(objects, mappings, target_collection, filter, groups)
+        # Warm up the compiled setters and the decoder.
+        bench.run_input(source(10))
+        return bench.run_input(source(ticks))
+    return run
+
+
+def learn_case(objects, custom_properties):
+    def run(bench, ticks):
+        bench.setup(objects, 0)
+        midi = bench.midi
+        obj = bpy.context.selected_objects[0]
+        scenarios.add_custom_properties(obj, custom_properties)
+
+        def learn(ticks):
+            # The selected object is moved while a control is touched, between the updates
+            # msgbus and the depsgraph handler report the move.
+            for messages in scenarios.fader_sweep(ticks, per_tick=1):
+                obj.location[0] += 0.01
+                midi.on_learn_property_changed("location")
+                midi.learn_dirty = True
+                midi.current_mapping_state = midi.State.REGISTER_CONTROL
+                yield messages
+        bench.run_input(learn(10))
+        return bench.run_input(learn(ticks))
+    return run
+
+
+def keyframe_case(objects, mappings):
+    def run(bench, ticks):
+        bench.setup(objects, mappings)
+        scene = bpy.context.scene
+
+        def insert(i):
+            scene.frame_current = i + 1
+            bench.midi.insert_keyframes()
+        return bench.run_operation(insert, max(ticks // 10, 5))
+    return run
+
+
+def save_load_case(mappings):
+    def run(bench, ticks):
+        bench.setup(10, mappings)
+        midi = bench.midi
+
+        def save_load(i):
+            midi.save()
+            midi.flush_save()
+            midi.load()
+        return bench.run_operation(save_load, max(ticks // 10, 5))
+    return run
+
+
+one_euro = {"mode": "ONE_EURO", "min_cutoff": 1.0, "beta": 0.5, "epsilon": 1e-4}
+
+cases = [
+    ("sweep/10 objects/1 mapping", input_case(10, 1, scenarios.fader_sweep)),
+    ("sweep/1k objects/1 mapping", input_case(1000, 1, scenarios.fader_sweep)),
+    ("sweep/10k objects/1 mapping", input_case(10000, 1, scenarios.fader_sweep)),
+    ("sweep/10k objects/1 mapping/collection",
+     input_case(10000, 1, scenarios.fader_sweep, scenarios.collection_name)),
+    ("burst/10 objects/1000 mappings", input_case(10, 1000, scenarios.channel_burst)),
+    ("burst/1k objects/100 mappings", input_case(1000, 100, scenarios.channel_burst)),
+    ("burst/10k objects/100 mappings/4 groups",
+     input_case(10000, 100, scenarios.channel_burst, groups=4)),
+    ("burst/10 objects/100 mappings/one-euro", input_case(10, 100, scenarios.channel_burst, filter=one_euro)),
+    ("notes/10 objects/1000 mappings", input_case(10, 1000, scenarios.note_storm)),
+    ("learn/1k objects/100 custom properties", learn_case(1000, 100)),
+    ("keyframes/1k objects/10 mappings", keyframe_case(1000, 10)),
+    ("save and load/1000 mappings", save_load_case(1000)),
+]
+
+# Higher is better for rate, lower for the others.
+compared = ["rate", "latency_p50", "time_p50"]
+
+
+def best(runs):
+    # The least disturbed run, by its update time.
+    return min(runs, key=lambda result: result["time_p50"])
+
+
+def baseline_path():
+    return os.path.join(benchmark_directory, "baselines", f"{backend}.json")
+
+
+def regressions(result, baseline, tolerance):
+    found = []
+    for field in compared:
+        value = result.get(field)
+        stored = baseline.get(field)
+        if value is None or stored is None or stored == 0:
+            continue
+        if field == "rate":
+            change = stored / value - 1.0
+        else:
+            change = value / stored - 1.0
+        if change > tolerance:
+            found.append(f"{field} {change * 100:+.0f}%")
+    return found
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks of the midi input path")
+    parser.add_argument("--case", action="append", default=[])
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--save", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    options = parser.parse_args(argv)
+
+    baselines = {}
+    if os.path.exists(baseline_path()):
+        with open(baseline_path()) as baseline_file:
+            baselines = json.load(baseline_file)
+
+    bench = Bench(load_addon())
+    results = {}
+    failed = []
+    print(f"backend: {backend}, ticks: {options.ticks}")
+    print(f"{'case':46} {'rate/s':>10} {'lat p50':>8} {'lat p95':>8} {'lat p99':>8} "
+          f"{'time p50':>8} {'time p95':>8} {'time max':>8}  (ms)")
+    for name, run in cases:
+        if options.case and not any(part in name for part in options.case):
+            continue
+        # The add-on reports connects, loads and errors with print, only show them on failures.
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                runs = []
+                for i in range(max(options.repeat, 1)):
+                    runs.append(run(bench, options.ticks))
+                    bench.close()
+        except Exception:
+            print(output.getvalue())
+            raise
+        result = best(runs)
+        if "Failed" in output.getvalue():
+            print(output.getvalue())
+        results[name] = result
+
+        def column(field):
+            value = result[field]
+            return f"{'-' if value is None else value:>8}"
+        line = f"{name:46} {result['rate']:>10} " + " ".join(
+            column(field) for field in ["latency_p50", "latency_p95", "latency_p99",
+                                        "time_p50", "time_p95", "time_max"])
+        if name in baselines:
+            found = regressions(result, baselines[name], options.tolerance)
+            if found:
+                failed.append(name)
+                line += "  REGRESSED: " + ", ".join(found)
+        print(line)
+
+    if options.save:
+        baselines.update(results)
+        os.makedirs(os.path.dirname(baseline_path()), exist_ok=True)
+        with open(baseline_path(), "w") as baseline_file:
+            json.dump(baselines, baseline_file, indent=4)
+        print(f"Stored baseline: {baseline_path()}")
+    if options.check and failed:
+        print(f"{len(failed)} case(s) regressed")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    # blender passes its own arguments, ours come after --.
+    arguments = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    sys.exit(main(arguments))
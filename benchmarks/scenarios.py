@@ -0,0 +1,166 @@
+"""
+Scenes, mappings and synthetic midi input for the benchmarks, see run.py.
+
+Works on the stand-in from bpy_stub.py as well as on blender itself.
+"""
+import math
+import random
+
+# Collection holding every benchmark object, targeted by the collection cases.
+collection_name = "MidiControlBenchmark"
+
+# Controls that decode to a single 7-bit event with high resolution enabled,
+# 0-63 are 14-bit pairs and 96-101 drive NRPN/RPN.
+controls = list(range(64, 96)) + list(range(102, 128))
+
+array_properties = ["location", "rotation_euler", "scale"]
+
+
+def control_change_key(event_class, channel, number):
+    return event_class.key(event_class.CONTROL_CHANGE, channel, number)
+
+
+def build_scene(bpy, count):
+    """Adds count selected objects, linked to the benchmark collection.
+    """
+    if getattr(bpy, "stub", False):
+        from bpy_stub import Object, ObjectCollection
+        objects = [Object(f"Benchmark.{i:05d}") for i in range(count)]
+        bpy.data.objects[:] = objects
+        for obj in objects:
+            obj.select_set(True)
+        bpy.context.selected_objects = list(objects)
+        bpy.data.collections[collection_name] = ObjectCollection(collection_name, objects)
+        return objects
+
+    collection = bpy.data.collections.new(collection_name)
+    bpy.context.scene.collection.children.link(collection)
+    objects = []
+    for i in range(count):
+        obj = bpy.data.objects.new(f"Benchmark.{i:05d}", None)
+        collection.objects.link(obj)
+        objects.append(obj)
+    bpy.context.view_layer.update()
+    for obj in objects:
+        obj.select_set(True)
+    return objects
+
+
+def clear_scene(bpy):
+    if getattr(bpy, "stub", False):
+        bpy.data.objects[:] = []
+        bpy.context.selected_objects = []
+        bpy.data.collections.clear()
+        return
+    collection = bpy.data.collections.get(collection_name)
+    if collection is not None:
+        bpy.data.batch_remove(list(collection.objects))
+        bpy.data.collections.remove(collection)
+
+
+def add_custom_properties(obj, count):
+    """Adds count float custom properties to obj, read by learn mode on every change.
+    """
+    for i in range(count):
+        obj[f"benchmark_{i:03d}"] = float(i)
+
+
+def build_selection_groups(event_class, objects, count):
+    """{routing key (str): group} of count groups splitting objects, bound to notes of channel 16.
+    """
+    size = len(objects) // count
+    groups = {}
+    for i in range(count):
+        key = str(event_class.key(event_class.NOTE_ON, 15, i))
+        groups[key] = {
+            "name": f"Group {i}",
+            "selected_objects": [obj.name for obj in objects[i * size:(i + 1) * size]]
+        }
+    return groups
+
+
+def make_mapping(property, index, target_collection="", filter=None, target_group=""):
+    mapping = {
+        "name": f"{property}_{index}",
+        "property": property,
+        "index": index,
+        "key": False,
+        "data": False,
+        "type": "<class 'Vector'>",
+        "min": 0.0,
+        "max": 1.0,
+        "resolution": 7,
+        "target_collection": target_collection,
+        "target_group": target_group,
+        "simplify_tolerance": 0.0,
+        "curve": "LINEAR",
+        "curve_amount": 4.0,
+        "curve_steps": 4,
+        "curve_invert": False,
+    }
+    if filter is not None:
+        mapping["filter"] = dict(filter)
+    return mapping
+
+
+def build_mappings(event_class, count, target_collection="", filter=None, target_groups=None):
+    """{routing key (str): [mapping, ...]}, spread over every control of all 16 channels,
+    controls get several mappings once there are more mappings than controls.
+    Mappings take turns writing to target_groups when given.
+    """
+    mappings = {}
+    for i in range(count):
+        channel = (i // len(controls)) % 16
+        number = controls[i % len(controls)]
+        key = str(control_change_key(event_class, channel, number))
+        prop = array_properties[i % len(array_properties)]
+        target_group = "" if not target_groups else target_groups[i % len(target_groups)]
+        mappings.setdefault(key, []).append(
+            make_mapping(prop, (i // len(array_properties)) % 3, target_collection, filter, target_group))
+    return mappings
+
+
+def fader_sweep(ticks, per_tick=8):
+    """One fader moved up and down, per_tick messages arrive between two updates.
+    """
+    value = 0
+    step = 1
+    for tick in range(ticks):
+        messages = []
+        for i in range(per_tick):
+            messages.append([0xB0, controls[0], value])
+            if value + step > 127 or value + step < 0:
+                step = -step
+            value += step
+        yield messages
+
+
+def channel_burst(ticks, per_channel=8):
+    """per_channel controls of all 16 channels move every update, like a mixer recall.
+    """
+    for tick in range(ticks):
+        messages = []
+        for channel in range(16):
+            for i in range(per_channel):
+                value = int(63.5 + 63.5 * math.sin((tick + i + channel) * 0.1))
+                messages.append([0xB0 | channel, controls[i], value])
+        yield messages
+
+
+def note_storm(ticks, per_tick=64, seed=1):
+    """Random note on/off on all channels, none of which are coalesced.
+    """
+    generator = random.Random(seed)
+    held = []
+    for tick in range(ticks):
+        messages = []
+        for i in range(per_tick):
+            if held and generator.random() < 0.5:
+                channel, note = held.pop(generator.randrange(len(held)))
+                messages.append([0x80 | channel, note, 0])
+            else:
+                channel = generator.randrange(16)
+                note = generator.randrange(128)
+                held.append((channel, note))
+                messages.append([0x90 | channel, note, generator.randrange(1, 128)])
+        yield messages